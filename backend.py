@@ -1,26 +1,52 @@
 # ========== GOD MODE TIMETABLE GENERATOR - CLEANED PRODUCTION VERSION ==========
 # ALL ISSUES FIXED: No job queue, no duplicates, fixed non-preferred highlighting
-from fastapi import FastAPI, Form, Request, HTTPException
+from fastapi import FastAPI, Form, Query, Request, HTTPException
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-import re, os, html, time, asyncio, json, logging, itertools, math, sys
-from typing import List, Dict, Tuple, Optional, Set, Any
-from collections import defaultdict
-from dataclasses import dataclass, asdict
-from functools import partial, lru_cache
-from concurrent.futures import ProcessPoolExecutor
+import re, os, html, time, asyncio, json, queue, logging, itertools, math, sys, hashlib, mmap, struct, argparse, bisect, heapq, gzip, random
+from typing import List, Dict, Tuple, Optional, Set, Any, Iterable, Iterator, Callable
+from collections import defaultdict, OrderedDict, deque
+from dataclasses import dataclass, asdict, field
+from functools import partial, lru_cache, cached_property
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import threading, multiprocessing
 from datetime import datetime
 from pathlib import Path
 from auth_utils import is_email_allowed
 import jwt
-from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response, StreamingResponse
 
 # ========== SETUP ==========
 app = FastAPI(title="Timetable Generator API", version="3.0.0")
 
 # Environment-based configuration
 OUTPUT_FILE = os.getenv("OUTPUT_FILE", "output.txt")
+# Pre-compiled binary snapshot of OUTPUT_FILE (see `python backend.py compile-catalog`)
+COMPILED_CATALOG = os.getenv("COMPILED_CATALOG", f"{OUTPUT_FILE}.catalog")
+
+def _parse_catalog_sources(spec: str) -> Dict[str, str]:
+    """Parse "id=path,id=path" into an ordered {catalog_id: path} map."""
+    sources: Dict[str, str] = {}
+    for entry in spec.split(","):
+        catalog_id, _, path = entry.partition("=")
+        if catalog_id.strip() and path.strip():
+            sources[catalog_id.strip()] = path.strip()
+    return sources
+
+# Catalogs served by this deployment (per term/campus), e.g.
+# CATALOGS="2025-odd=output.txt,2026-even=data/even.txt". Without it a single
+# "default" catalog is served from OUTPUT_FILE.
+CATALOG_SOURCES = _parse_catalog_sources(os.getenv("CATALOGS", "")) or {"default": OUTPUT_FILE}
+DEFAULT_CATALOG = os.getenv("DEFAULT_CATALOG", "")
+if DEFAULT_CATALOG not in CATALOG_SOURCES:
+    DEFAULT_CATALOG = next(iter(CATALOG_SOURCES))
+# Loaded at startup and never evicted (the current term)
+PRELOAD_CATALOGS = [
+    c.strip() for c in os.getenv("PRELOAD_CATALOGS", DEFAULT_CATALOG).split(",")
+    if c.strip() in CATALOG_SOURCES
+]
+# Memory budget for parsed catalogs; least recently used ones are dropped beyond it
+CATALOG_CACHE_MB = float(os.getenv("CATALOG_CACHE_MB", "512"))
 TIMETABLE_TIMEOUT = int(os.getenv("TIMETABLE_TIMEOUT", "30"))
 CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*").split(",") if os.getenv("CORS_ORIGINS") else ["*"]
 if CORS_ORIGINS != ["*"]:
@@ -35,6 +61,48 @@ app.add_middleware(
     max_age=3600,
 )
 
+# Catalog change detection (inotify when available, stat polling otherwise)
+CATALOG_WATCH = os.getenv("CATALOG_WATCH", "1").lower() not in ("0", "false", "no")
+CATALOG_POLL_INTERVAL = float(os.getenv("CATALOG_POLL_INTERVAL", "2"))
+
+# Number of distinct searches whose sorted results are kept in memory
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "64"))
+
+# Streaming /generate: a worker forwards this many results as it finds them
+# (the first right away, then in doubling batches), then only the running
+# count; partial batches and counts are sent after this many seconds
+STREAM_PREVIEW_RESULTS = int(os.getenv("STREAM_PREVIEW_RESULTS", "100"))
+STREAM_BATCH_SECONDS = float(os.getenv("STREAM_BATCH_SECONDS", "0.1"))
+
+# Early /generate responses (early=yes) are ranked from the first
+# EARLY_RESULTS timetables found (at most STREAM_PREVIEW_RESULTS), or from
+# whatever was found after EARLY_RESPONSE_SECONDS; the search carries on
+# in the background
+EARLY_RESULTS = int(os.getenv("EARLY_RESULTS", "50"))
+EARLY_RESPONSE_SECONDS = float(os.getenv("EARLY_RESPONSE_SECONDS", "1.0"))
+
+# Threads that rank, render and encode results so the event loop only handles I/O
+RENDER_THREADS = int(os.getenv("RENDER_THREADS", "2"))
+
+# Threads that wait on the progress queues of running searches (streams and
+# early responses), apart from the default executor
+PROGRESS_THREADS = int(os.getenv("PROGRESS_THREADS", "16"))
+
+# order=index /generate: completions counted per (course, occupied slots) for
+# random access to any page; searches needing more states than this are
+# searched and ranked as usual
+RESULT_SPACE_STATES = int(os.getenv("RESULT_SPACE_STATES", "200000"))
+
+# sample=yes /generate: time budget for drawing random timetables, and draws
+# allowed when they can't be counted and conflicting ones are rejected instead
+SAMPLE_TIMEOUT = float(os.getenv("SAMPLE_TIMEOUT", "5"))
+SAMPLE_MAX_ATTEMPTS = int(os.getenv("SAMPLE_MAX_ATTEMPTS", "200000"))
+# Counting states allowed when sampling (a one-off count in the search worker)
+SAMPLE_SPACE_STATES = int(os.getenv("SAMPLE_SPACE_STATES", "1000000"))
+
+# diverse=N /generate: the N are picked from this many top-ranked timetables
+DIVERSE_POOL = int(os.getenv("DIVERSE_POOL", "1000"))
+
 # Rate limiting (simple memory-based)
 RATE_LIMIT_REQUESTS = int(os.getenv("RATE_LIMIT_REQUESTS", "10"))
 RATE_LIMIT_WINDOW = int(os.getenv("RATE_LIMIT_WINDOW", "60"))
@@ -128,6 +196,34 @@ async def check_rate_limit(request: Request):
             detail=f"Rate limit exceeded. Try again in {RATE_LIMIT_WINDOW} seconds."
         )
 
+# ========== LATENCY METRICS ==========
+# Recent samples kept per metric
+LATENCY_SAMPLES = 1000
+
+class LatencyTracker:
+    """Rolling latency samples per metric, summarised on /health."""
+    def __init__(self, max_samples: int = LATENCY_SAMPLES):
+        self._samples: Dict[str, deque] = defaultdict(partial(deque, maxlen=max_samples))
+        self._lock = threading.Lock()
+    
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            self._samples[name].append(seconds)
+    
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            samples = {name: sorted(values) for name, values in self._samples.items() if values}
+        return {
+            name: {
+                "count": len(values),
+                "p50_ms": round(values[len(values) // 2] * 1000, 1),
+                "p95_ms": round(values[min(len(values) - 1, int(len(values) * 0.95))] * 1000, 1),
+            }
+            for name, values in samples.items()
+        }
+
+latency_metrics = LatencyTracker()
+
 # ========== PROCESS POOL MANAGEMENT ==========
 _process_pool = None
 _process_pool_lock = threading.Lock()
@@ -142,41 +238,477 @@ def get_process_pool():
             logger.info(f"Created process pool with {max_workers} workers")
         return _process_pool
 
+_render_pool = None
+
+def get_render_pool():
+    """Get or create the thread pool for CPU work on results held in this process."""
+    global _render_pool
+    with _process_pool_lock:
+        if _render_pool is None:
+            _render_pool = ThreadPoolExecutor(max_workers=max(1, RENDER_THREADS), thread_name_prefix="render")
+        return _render_pool
+
+async def off_loop(fn: Callable, *args):
+    """Run `fn(*args)` on the render pool; results and their caches stay in memory."""
+    return await asyncio.get_running_loop().run_in_executor(get_render_pool(), partial(fn, *args))
+
+_progress_pool = None
+
+def get_progress_pool():
+    """Get or create the thread pool that waits on search progress queues."""
+    global _progress_pool
+    with _process_pool_lock:
+        if _progress_pool is None:
+            _progress_pool = ThreadPoolExecutor(max_workers=max(1, PROGRESS_THREADS), thread_name_prefix="progress")
+        return _progress_pool
+
+_stream_manager = None
+
+def get_stream_manager():
+    """Get or create the manager whose queues carry streamed results back from workers."""
+    global _stream_manager
+    with _process_pool_lock:
+        if _stream_manager is None:
+            _stream_manager = multiprocessing.Manager()
+        return _stream_manager
+
 # ========== CACHE MANAGEMENT ==========
+@dataclass
+class CatalogDiff:
+    """What changed between two catalog versions.
+
+    `changed` maps a course code to the section codes that were added,
+    removed or modified (all empty when only course metadata changed).
+    """
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    changed: Dict[str, Dict[str, List[str]]] = field(default_factory=dict)
+    
+    @property
+    def affected_codes(self) -> Set[str]:
+        return set(self.added) | set(self.removed) | set(self.changed)
+    
+    def is_empty(self) -> bool:
+        return not (self.added or self.removed or self.changed)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+@dataclass
+class CatalogSnapshot:
+    """Immutable, versioned view of the parsed course catalog.
+
+    Handlers capture one snapshot at the start of a request and use it
+    throughout, so a concurrent reload never changes data mid-request.
+    """
+    version: int
+    courses: Dict[str, Any]
+    source_mtime: float
+    loaded_at: float
+    catalog_id: str = ""
+    # Rough resident size, used for the registry's memory budget
+    approx_bytes: int = 0
+    # Course code -> hash of the "Subject:" block it was parsed from
+    block_hashes: Dict[str, str] = field(default_factory=dict)
+    # Changes relative to the previous version (None for the first load)
+    diff: Optional[CatalogDiff] = None
+    # Code lookups, built once per version
+    index: Optional["CourseIndex"] = None
+    # Encoded responses derived from this version, built on first use
+    responses: Dict[str, "PrecompressedBody"] = field(default_factory=dict)
+
+# Versions are unique across catalogs so cached results can't be confused
+_catalog_versions = itertools.count(1)
+
+def compiled_path_for(path: str) -> str:
+    """Location of the compiled snapshot for a catalog source file."""
+    return COMPILED_CATALOG if path == OUTPUT_FILE else f"{path}.catalog"
+
 class CourseCache:
-    """Manages course data caching with file monitoring."""
-    def __init__(self):
-        self._cache = None
-        self._cache_mtime = 0
+    """Double-buffered cache for one course catalog.
+
+    A reload parses the file into a new snapshot off to the side and only
+    swaps it in once it validated; readers keep whatever snapshot they
+    already hold.
+    """
+    def __init__(self, catalog_id: str, path: str, compiled_path: str = None):
+        self.catalog_id = catalog_id
+        self.path = path
+        self.compiled_path = compiled_path or compiled_path_for(path)
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._lock = threading.Lock()
+        # Serializes parses so concurrent reloads don't duplicate work
+        self.reload_lock = threading.Lock()
+    
+    def get(self) -> Optional[CatalogSnapshot]:
+        """Get the active snapshot.
+
+        Lock-free: reading one attribute is atomic, and freshness is the
+        CatalogWatcher's job rather than every request's.
+        """
+        return self._snapshot
+    
+    def swap(self, courses: Dict[str, Any], source_mtime: float,
+             block_hashes: Dict[str, str] = None,
+             diff: Optional[CatalogDiff] = None,
+             prepare: Optional[Callable[[CatalogSnapshot], None]] = None) -> CatalogSnapshot:
+        """Atomically publish a new catalog version.
+
+        `prepare` runs on the new snapshot before any reader can see it.
+        """
+        snapshot = CatalogSnapshot(
+            version=next(_catalog_versions),
+            courses=courses,
+            source_mtime=source_mtime,
+            loaded_at=time.time(),
+            catalog_id=self.catalog_id,
+            approx_bytes=estimate_catalog_bytes(courses),
+            block_hashes=block_hashes or {},
+            diff=diff,
+            index=CourseIndex(courses)
+        )
+        if prepare is not None:
+            prepare(snapshot)
+        with self._lock:
+            self._snapshot = snapshot
+            return snapshot
+    
+    def clear(self):
+        """Drop the active snapshot (the version counter keeps increasing)."""
+        with self._lock:
+            self._snapshot = None
+
+def estimate_catalog_bytes(courses: Dict[str, Any]) -> int:
+    """Approximate memory held by parsed courses.
+
+    Calibrated with tracemalloc: about 200 bytes per TimeSlot and per
+    CourseSection object, plus per-course overhead.
+    """
+    n_sections = n_slots = 0
+    for course in courses.values():
+        n_sections += len(course.sections)
+        for section in course.sections:
+            n_slots += len(section.time_slots)
+    return 400 * len(courses) + 200 * n_sections + 200 * n_slots
+
+@dataclass
+class CachedResult:
+    """Sorted results of one search, tagged with what they were computed from."""
+    timetables: List[Any]
+    staff_warnings: List[Dict[str, Any]]
+    staff_deviations: List[Dict[str, Any]]
+    stats: Dict[str, Any]
+    depends_on: Set[str]
+    whole_catalog: bool
+    catalog_version: int
+    catalog_id: str = ""
+    # Aggregates over the whole result set, for rendering any page
+    summary: Optional["ResultSummary"] = None
+    # HTML fragments rendered for earlier page views of this result set
+    render_cache: Optional["RenderCache"] = None
+    # Scores in rank order, and the encoded JSON results per catalog version
+    scores: Optional[List[float]] = None
+    json_body: Optional[Tuple[int, "PrecompressedBody"]] = None
+    # Where the search stopped, if it stopped early (see SearchCheckpoint)
+    checkpoint: Optional["SearchCheckpoint"] = None
+    # Diverse selections from these results, by size (see diverse_result)
+    diverse: Dict[int, "CachedResult"] = field(default_factory=dict)
+
+class ResultCache:
+    """LRU cache of search results, indexed by the course codes they depend on.
+
+    A catalog reload only evicts entries that include a changed course;
+    everything else is carried forward to the new catalog version.
+    Entries selecting the whole catalog are also evicted when courses are
+    added or removed.
+    """
+    def __init__(self, max_entries: int = RESULT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedResult]" = OrderedDict()
+        # (catalog id, course code) -> keys of entries including that course
+        self._by_code: Dict[Tuple[str, str], Set[str]] = defaultdict(set)
+        self._whole_catalog: Set[str] = set()
+        self._catalog_versions: Dict[str, int] = {}
         self._lock = threading.Lock()
     
-    def get(self) -> Optional[Dict[str, Any]]:
-        """Get cached courses if still valid."""
+    @staticmethod
+    def make_key(catalog_id: str, selected_codes: List[str], params: Dict[str, Any]) -> str:
+        payload = json.dumps([catalog_id, selected_codes, params], sort_keys=True, default=str)
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+    
+    def get(self, key: str, catalog_version: int) -> Optional[CachedResult]:
         with self._lock:
-            if not os.path.exists(OUTPUT_FILE):
+            entry = self._entries.get(key)
+            if entry is None or entry.catalog_version != catalog_version:
                 return None
+            self._entries.move_to_end(key)
+            return entry
+    
+    def put(self, key: str, entry: CachedResult):
+        with self._lock:
+            # Computed against a catalog that has since been replaced
+            if entry.catalog_version < self._catalog_versions.get(entry.catalog_id, 0):
+                return
+            self._remove(key)
+            self._entries[key] = entry
+            for code in entry.depends_on:
+                self._by_code[(entry.catalog_id, code)].add(key)
+            if entry.whole_catalog:
+                self._whole_catalog.add(key)
             
-            current_mtime = os.path.getmtime(OUTPUT_FILE)
-            if self._cache is not None and current_mtime == self._cache_mtime:
-                return self._cache
-            return None
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+    
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for code in entry.depends_on:
+            index_key = (entry.catalog_id, code)
+            keys = self._by_code.get(index_key)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_code[index_key]
+        self._whole_catalog.discard(key)
+    
+    def apply_catalog_update(self, catalog_id: str, catalog_version: int,
+                             diff: Optional[CatalogDiff]):
+        """Evict entries affected by `diff` and carry the rest forward."""
+        with self._lock:
+            entries = {k: e for k, e in self._entries.items() if e.catalog_id == catalog_id}
+            if diff is None:
+                stale = set(entries)
+            else:
+                stale = set()
+                for code in diff.affected_codes:
+                    stale |= self._by_code.get((catalog_id, code), set())
+                if diff.added or diff.removed:
+                    stale |= self._whole_catalog & set(entries)
+            
+            for key in stale:
+                self._remove(key)
+                del entries[key]
+            for entry in entries.values():
+                entry.catalog_version = catalog_version
+            self._catalog_versions[catalog_id] = catalog_version
+        
+        if stale or entries:
+            logger.info(
+                f"Result cache [{catalog_id}]: evicted {len(stale)}, carried {len(entries)} "
+                f"forward to catalog version {catalog_version}"
+            )
     
-    def set(self, courses: Dict[str, Any]):
-        """Set cache with current file state."""
+    def drop_catalog(self, catalog_id: str):
+        """Forget every entry computed from `catalog_id`."""
         with self._lock:
-            if os.path.exists(OUTPUT_FILE):
-                self._cache = courses
-                self._cache_mtime = os.path.getmtime(OUTPUT_FILE)
+            for key in [k for k, e in self._entries.items() if e.catalog_id == catalog_id]:
+                self._remove(key)
     
     def clear(self):
-        """Clear cache."""
         with self._lock:
-            self._cache = None
-            self._cache_mtime = 0
+            self._entries.clear()
+            self._by_code.clear()
+            self._whole_catalog.clear()
+
+result_cache = ResultCache()
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:
+    INotify = None
+
+class CatalogWatcher:
+    """Background thread that reloads the catalog when its file changes.
+
+    Watches the containing directory with inotify so that atomic
+    replace-by-rename is seen too, and falls back to polling os.stat()
+    where inotify isn't available.
+    """
+    DEBOUNCE_SECONDS = 0.2
+    
+    def __init__(self, path: str, on_change, poll_interval: float = CATALOG_POLL_INTERVAL):
+        self.path = os.path.abspath(path)
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.mode: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="catalog-watcher", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+    
+    def _run(self):
+        if INotify is not None:
+            try:
+                self._watch_inotify()
+                return
+            except OSError as e:
+                logger.warning(f"inotify unavailable ({e}), polling {self.path} instead")
+        self._watch_polling()
+    
+    def _fire(self):
+        try:
+            self.on_change()
+        except Exception as e:
+            logger.error(f"Catalog reload after file change failed: {e}", exc_info=True)
+    
+    def _watch_inotify(self):
+        directory, name = os.path.split(self.path)
+        inotify = INotify()
+        try:
+            mask = inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO | inotify_flags.CREATE
+            inotify.add_watch(directory, mask)
+            self.mode = "inotify"
+            logger.info(f"Watching {self.path} with inotify")
+            
+            while not self._stop.is_set():
+                events = inotify.read(timeout=1000)
+                if not any(event.name == name for event in events):
+                    continue
+                # Coalesce a burst (create, writes, close) into one reload
+                debounce_ms = int(self.DEBOUNCE_SECONDS * 1000)
+                while any(event.name == name for event in inotify.read(timeout=debounce_ms)):
+                    pass
+                self._fire()
+        finally:
+            inotify.close()
+    
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+    
+    def _watch_polling(self):
+        self.mode = "polling"
+        logger.info(f"Polling {self.path} every {self.poll_interval}s")
+        last_seen = self._stat()
+        
+        while not self._stop.wait(self.poll_interval):
+            current = self._stat()
+            if current != last_seen:
+                last_seen = current
+                # Let a burst of writes settle before reparsing
+                if current is not None and not self._stop.wait(self.DEBOUNCE_SECONDS):
+                    self._fire()
+
+class CatalogRegistry:
+    """Catalogs addressed by id, with parsed snapshots kept in an LRU.
+
+    Catalogs are parsed on first use; once the estimated size of loaded
+    snapshots exceeds the memory budget the least recently used ones are
+    dropped (requests already holding a snapshot keep it). Preloaded
+    catalogs are pinned.
+    """
+    def __init__(self, sources: Dict[str, str], default_id: str,
+                 max_bytes: int, pinned: List[str] = None):
+        self.default_id = default_id
+        self.max_bytes = max_bytes
+        self.pinned = set(pinned or [])
+        self._caches = {cid: CourseCache(cid, path) for cid, path in sources.items()}
+        self._lru: "OrderedDict[str, None]" = OrderedDict()
+        self._watchers: Dict[str, CatalogWatcher] = {}
+        self._lock = threading.Lock()
+    
+    def resolve(self, catalog_id: Optional[str]) -> Optional[str]:
+        """Map a requested id (blank means the default) to a known id, or None."""
+        catalog_id = (catalog_id or "").strip() or self.default_id
+        return catalog_id if catalog_id in self._caches else None
+    
+    def cache_for(self, catalog_id: Optional[str]) -> CourseCache:
+        resolved = self.resolve(catalog_id)
+        if resolved is None:
+            raise KeyError(f"Unknown catalog: {catalog_id}")
+        return self._caches[resolved]
+    
+    def ids(self) -> List[str]:
+        return list(self._caches)
+    
+    def loaded_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._lru)
+    
+    def touch(self, catalog_id: str):
+        with self._lock:
+            if catalog_id in self._lru:
+                self._lru.move_to_end(catalog_id)
+    
+    def note_loaded(self, catalog_id: str):
+        """Record a (re)loaded catalog and enforce the memory budget."""
+        evicted = []
+        with self._lock:
+            self._lru[catalog_id] = None
+            self._lru.move_to_end(catalog_id)
+            
+            loaded = {cid: self._caches[cid].get() for cid in self._lru}
+            total = sum(snap.approx_bytes for snap in loaded.values() if snap)
+            for cid in list(self._lru):
+                if total <= self.max_bytes:
+                    break
+                if cid == catalog_id or cid in self.pinned:
+                    continue
+                snap = loaded[cid]
+                total -= snap.approx_bytes if snap else 0
+                self._caches[cid].clear()
+                del self._lru[cid]
+                evicted.append(cid)
+        
+        for cid in evicted:
+            result_cache.drop_catalog(cid)
+            logger.info(f"Evicted catalog {cid} from memory (budget {self.max_bytes / 1e6:.0f} MB)")
+    
+    def start_watching(self):
+        for cid, cache in self._caches.items():
+            if cid not in self._watchers:
+                self._watchers[cid] = CatalogWatcher(cache.path, on_change=partial(self._on_file_change, cid))
+            self._watchers[cid].start()
+    
+    def stop_watching(self):
+        for watcher in self._watchers.values():
+            watcher.stop()
+    
+    def watcher_mode(self, catalog_id: str) -> Optional[str]:
+        watcher = self._watchers.get(catalog_id)
+        return watcher.mode if watcher else None
+    
+    def _on_file_change(self, catalog_id: str):
+        # Unloaded catalogs are read fresh on first use anyway
+        if self._caches[catalog_id].get() is not None:
+            load_catalog(force_reload=True, catalog_id=catalog_id)
 
-course_cache = CourseCache()
+catalog_registry = CatalogRegistry(
+    CATALOG_SOURCES, DEFAULT_CATALOG,
+    max_bytes=int(CATALOG_CACHE_MB * 1024 * 1024),
+    pinned=PRELOAD_CATALOGS
+)
 
 # ========== TIME / PARSING HELPERS ==========
+# Compiled once at import; the parser runs these for every line of output.txt
+_TIME_PATTERNS = [
+    re.compile(r'^(\d{1,2})[:\.](\d{2})$'),
+    re.compile(r'^(\d{3,4})$'),
+]
+_NON_DIGIT_RE = re.compile(r'[^0-9]')
+_TIME_RANGE_PATTERNS = [
+    re.compile(r'(\d{1,2}(?:[:.]\d{1,2})?)\s*(?:[-–—~=@©]|to)\s*(\d{1,2}(?:[:.]\d{1,2})?)', re.IGNORECASE),
+    re.compile(r'(\d{1,2}[:.]\d{2})\s+(\d{1,2}[:.]\d{2})', re.IGNORECASE),
+    re.compile(r'(\d{1,2})\s*[-–—~=]\s*(\d{1,2})', re.IGNORECASE),
+]
+_TIME_RANGE_SPLIT_RE = re.compile(r'[,，;、\n]')
+_TIME_TOKEN_RE = re.compile(r'\d{1,2}(?:[:.]\d{1,2})?')
+
 def extract_hours_minutes(t: str) -> Tuple[int, int]:
     """Extract hours and minutes from a time string with validation."""
     t = str(t or "").strip()
@@ -184,13 +716,8 @@ def extract_hours_minutes(t: str) -> Tuple[int, int]:
         return 0, 0
     
     # Try to parse HH:MM or HH.MM format first
-    time_patterns = [
-        r'^(\d{1,2})[:\.](\d{2})$',
-        r'^(\d{3,4})$',
-    ]
-    
-    for pattern in time_patterns:
-        m = re.match(pattern, t)
+    for pattern in _TIME_PATTERNS:
+        m = pattern.match(t)
         if m:
             if len(m.groups()) == 2:
                 hours = int(m.group(1))
@@ -215,7 +742,7 @@ def extract_hours_minutes(t: str) -> Tuple[int, int]:
             return hours, minutes
     
     # Fallback parsing
-    digits = re.sub(r'[^0-9]', '', t)
+    digits = _NON_DIGIT_RE.sub('', t)
     if not digits:
         return 0, 0
     
@@ -254,6 +781,8 @@ def time_to_minutes(t: str) -> int:
         logger.warning(f"Invalid time format: {t}")
         return 0
 
+HOUR_SLOT_MINUTES = [(time_to_minutes(hs), time_to_minutes(he)) for hs, he in HOUR_SLOTS]
+
 def minutes_to_time(m: int) -> str:
     """Convert minutes since midnight to time string."""
     if m < 0 or m >= 24 * 60:
@@ -280,14 +809,8 @@ def parse_single_time_range(part: str) -> Optional[Tuple[str, str]]:
         logger.warning(f"Ambiguous time range with multiple hyphens: {part}")
         return None
     
-    patterns = [
-        r'(\d{1,2}(?:[:.]\d{1,2})?)\s*(?:[-–—~=@©]|to)\s*(\d{1,2}(?:[:.]\d{1,2})?)',
-        r'(\d{1,2}[:.]\d{2})\s+(\d{1,2}[:.]\d{2})',
-        r'(\d{1,2})\s*[-–—~=]\s*(\d{1,2})',
-    ]
-    
-    for p in patterns:
-        m = re.search(p, part, flags=re.IGNORECASE)
+    for p in _TIME_RANGE_PATTERNS:
+        m = p.search(part)
         if m:
             a, b = m.group(1), m.group(2)
             try:
@@ -315,7 +838,7 @@ def parse_time_range_string(time_str: str) -> Tuple[List[Tuple[str, str]], List[
     
     ranges: List[Tuple[str, str]] = []
     warnings: List[str] = []
-    parts = re.split(r'[,，;、\n]', time_str)
+    parts = _TIME_RANGE_SPLIT_RE.split(time_str)
     
     for i, part in enumerate(parts):
         part = part.strip()
@@ -326,7 +849,7 @@ def parse_time_range_string(time_str: str) -> Tuple[List[Tuple[str, str]], List[
         if r:
             ranges.append(r)
         else:
-            tokens = re.findall(r'\d{1,2}(?:[:.]\d{1,2})?', part)
+            tokens = _TIME_TOKEN_RE.findall(part)
             if len(tokens) % 2 == 1:
                 warnings.append(f"Odd number of time tokens in '{part}', ignoring last token")
                 tokens = tokens[:-1]
@@ -348,13 +871,16 @@ def parse_time_range_string(time_str: str) -> Tuple[List[Tuple[str, str]], List[
     return ranges, warnings
 
 # ========== NORMALIZATION FUNCTIONS ==========
+_TRAILING_DOTS_RE = re.compile(r'[.\s]+$')
+_WHITESPACE_RE = re.compile(r'\s+')
+
 def normalize_faculty(name: str) -> str:
     """Normalize faculty name."""
     if not name:
         return ""
     s = str(name).strip()
-    s = re.sub(r'[.\s]+$', '', s)
-    s = re.sub(r'\s+', ' ', s)
+    s = _TRAILING_DOTS_RE.sub('', s)
+    s = _WHITESPACE_RE.sub(' ', s)
     return s
 
 def normalize_staff_name(name: str) -> str:
@@ -371,6 +897,71 @@ def normalize_staff_name(name: str) -> str:
     name = name.strip()
     return name
 
+class StaffTable:
+    """Process-wide, append-only table of normalized staff names.
+
+    Every section carries the small integer id of its normalized staff
+    name, so preference checks are integer lookups instead of regex
+    normalization. Ids are never reassigned, so they stay valid across
+    catalog versions and cached results. Id 0 is "no staff".
+    """
+    def __init__(self):
+        self.names: List[str] = [""]
+        self._ids: Dict[str, int] = {"": 0}
+        # Raw faculty string -> id, so each spelling is normalized once
+        self._by_faculty: Dict[str, int] = {}
+        self._lock = threading.Lock()
+    
+    def lookup(self, normalized_name: str) -> Optional[int]:
+        return self._ids.get(normalized_name)
+    
+    def id_for(self, normalized_name: str) -> int:
+        staff_id = self._ids.get(normalized_name)
+        if staff_id is None:
+            with self._lock:
+                staff_id = self._ids.get(normalized_name)
+                if staff_id is None:
+                    staff_id = self._ids[normalized_name] = len(self.names)
+                    self.names.append(normalized_name)
+        return staff_id
+    
+    def id_for_faculty(self, faculty: str) -> int:
+        staff_id = self._by_faculty.get(faculty)
+        if staff_id is None:
+            staff_id = self._by_faculty[faculty] = self.id_for(normalize_staff_name(faculty))
+        return staff_id
+    
+    def name(self, staff_id: int) -> str:
+        return self.names[staff_id]
+    
+    def sync(self, names: List[str]):
+        """Adopt another process's table (search workers use the server's ids)."""
+        if self.names == names[:len(self.names)]:
+            new_names = names[len(self.names):]
+        else:
+            self.names, self._ids, self._by_faculty = [""], {"": 0}, {}
+            new_names = names[1:]
+        for name in new_names:
+            self._ids[name] = len(self.names)
+            self.names.append(name)
+
+staff_table = StaffTable()
+
+def compile_staff_preferences(staff_preferences: Dict[str, List[str]]) -> Dict[str, Dict[int, int]]:
+    """Turn {course: [staff names]} into {course: {staff id: preference rank}}.
+
+    Names no section is taught by have no id and simply never match.
+    """
+    staff_ranks: Dict[str, Dict[int, int]] = {}
+    for code, names in (staff_preferences or {}).items():
+        ranks: Dict[int, int] = {}
+        for position, name in enumerate(names):
+            staff_id = staff_table.lookup(name)
+            if staff_id is not None:
+                ranks.setdefault(staff_id, position)
+        staff_ranks[code] = ranks
+    return staff_ranks
+
 def normalize_course_code(code: str) -> str:
     """Normalize course code to uppercase."""
     if not code:
@@ -393,25 +984,24 @@ def normalize_day(day: str) -> Optional[str]:
     return None
 
 # ========== PARSER HELPERS ==========
+_SECTION_LINE_PATTERNS = [
+    (re.compile(r'^\s*([^,]+?)\s*,\s*(.+?)\s*-\s*(.+)$'), 3),
+    (re.compile(r'^\s*([^,]+?)\s*,\s*(.+)$'), 2),
+    (re.compile(r'^\s*(.+)$'), 1),
+]
+
 def parse_section_line(line: str) -> Tuple[str, str, str]:
     """Parse section line with case-insensitive handling."""
     line = line.strip()
-    if line.lower().startswith("section:"):
-        colon_idx = line.lower().find(":")
-        line = line[colon_idx + 1:].strip()
-    
-    patterns = [
-        (r'^\s*([^,]+?)\s*,\s*(.+?)\s*-\s*(.+)$', 3),
-        (r'^\s*([^,]+?)\s*,\s*(.+)$', 2),
-        (r'^\s*(.+)$', 1),
-    ]
+    if line[:8].lower() == "section:":
+        line = line[8:].strip()
     
     section_code = ""
     dept = ""
     faculty = ""
     
-    for pat, count in patterns:
-        m = re.match(pat, line)
+    for pat, count in _SECTION_LINE_PATTERNS:
+        m = pat.match(line)
         if m:
             section_code = m.group(1).strip()
             if count >= 2:
@@ -423,34 +1013,186 @@ def parse_section_line(line: str) -> Tuple[str, str, str]:
     return section_code, dept, faculty
 
 # ========== COURSE FINDER HELPER ==========
-@lru_cache(maxsize=128)
-def find_course_code(subject_code: str, course_codes_str: str) -> Optional[str]:
-    """
-    Find a course code by code (case-insensitive, cached).
+_CODE_SEPARATORS_RE = re.compile(r'[\s\-_]+')
+
+def compact_course_code(code: str) -> str:
+    """Lookup key for a course code: case-, whitespace- and dash-insensitive."""
+    return _CODE_SEPARATORS_RE.sub('', code or '').casefold()
+
+_SEARCH_TOKEN_RE = re.compile(r'[^\W_]+')
+# Weight of a query word matching each field (doubled for a whole-word match)
+SEARCH_FIELD_WEIGHTS = {"code": 8, "name": 4, "faculty": 3, "type": 2}
+# Share of query trigrams a course must contain to count as a fuzzy match
+SEARCH_TRIGRAM_THRESHOLD = 0.6
+
+def search_tokens(text: str) -> List[str]:
+    return _SEARCH_TOKEN_RE.findall((text or "").casefold())
+
+def word_trigrams(word: str) -> Set[str]:
+    padded = f" {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class CourseIndex:
+    """Course code lookups and subject search for one catalog version.
+
+    Resolves user input to a catalog code by, in order: exact match,
+    case-insensitive match, match ignoring whitespace/dashes/underscores,
+    and finally a prefix of exactly one code ("19ai30" -> "19AI305").
     
-    Args:
-        subject_code: Code to look for
-        course_codes_str: Comma-separated string of available course codes
+    Search covers code, name, type and faculty through a sorted word list
+    (prefix matches) and a trigram index (typos and infix matches).
     """
-    subject_code_upper = subject_code.upper()
-    course_codes = course_codes_str.split(',')
+    def __init__(self, courses: Dict[str, Any]):
+        self.courses = courses
+        self._casefold: Dict[str, str] = {}
+        self._compact: Dict[str, str] = {}
+        for code in courses:
+            self._casefold.setdefault(code.casefold(), code)
+            self._compact.setdefault(compact_course_code(code), code)
+        self._sorted_keys = sorted(self._compact)
+        
+        # Code -> sorted distinct faculty names
+        self.staff: Dict[str, List[str]] = {
+            code: sorted({sec.faculty.strip() for sec in course.sections if sec.faculty})
+            for code, course in courses.items()
+        }
+        
+        self._codes = list(courses)
+        self._code_positions = {code: pos for pos, code in enumerate(self._codes)}
+        # word -> {course position: best field weight}
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._trigrams: Dict[str, List[int]] = defaultdict(list)
+        for pos, course in enumerate(courses.values()):
+            fields = [
+                ("code", [compact_course_code(course.code)] + search_tokens(course.code)),
+                ("name", search_tokens(course.name)),
+                ("type", search_tokens(course.course_type)),
+                ("faculty", [w for sec in course.sections for w in search_tokens(sec.faculty)]),
+            ]
+            grams: Set[str] = set()
+            for field_name, words in fields:
+                weight = SEARCH_FIELD_WEIGHTS[field_name]
+                for word in words:
+                    postings = self._postings[word]
+                    if postings.get(pos, 0) < weight:
+                        postings[pos] = weight
+                    grams |= word_trigrams(word)
+            for gram in grams:
+                self._trigrams[gram].append(pos)
+        self._sorted_words = sorted(self._postings)
+        # Short prefixes ("1", "19") match most of the catalog: keep their
+        # scores, warm the one-letter ones, and memoize whole answers
+        self._word_scores = lru_cache(maxsize=1024)(self._score_word)
+        for first in {word[0] for word in self._sorted_words}:
+            self._word_scores(first)
+        self._search = lru_cache(maxsize=1024)(self._rank)
+        
+        # Catalog-relative section ids: a course's offset plus section index
+        self.section_offsets: Dict[str, int] = {}
+        self.section_count = 0
+        for code, course in courses.items():
+            self.section_offsets[code] = self.section_count
+            self.section_count += len(course.sections)
     
-    # Exact match
-    if subject_code_upper in course_codes:
-        return subject_code_upper
+    def section_id(self, section: "CourseSection") -> int:
+        return self.section_offsets[section.subject_code] + section.index
     
-    # Case-insensitive match
-    for code in course_codes:
-        if code.upper() == subject_code_upper:
+    def resolve(self, subject_code: str) -> Optional[str]:
+        """Return the catalog code `subject_code` refers to, or None."""
+        if not subject_code:
+            return None
+        if subject_code in self.courses:
+            return subject_code
+        
+        stripped = subject_code.strip()
+        code = self._casefold.get(stripped.casefold())
+        if code is not None:
             return code
+        
+        key = compact_course_code(stripped)
+        if not key:
+            return None
+        code = self._compact.get(key)
+        if code is not None:
+            return code
+        
+        matches = self.prefix(key, limit=2)
+        return matches[0] if len(matches) == 1 else None
     
-    return None
+    def prefix(self, prefix: str, limit: int = 20) -> List[str]:
+        """Catalog codes whose compact form starts with `prefix`, in sorted order."""
+        key = compact_course_code(prefix)
+        keys = self._sorted_keys
+        i = bisect.bisect_left(keys, key)
+        matches = []
+        while i < len(keys) and len(matches) < limit and keys[i].startswith(key):
+            matches.append(self._compact[keys[i]])
+            i += 1
+        return matches
+    
+    def get(self, subject_code: str) -> Optional[Any]:
+        code = self.resolve(subject_code)
+        return self.courses[code] if code is not None else None
+    
+    def search(self, query: str, limit: int = 20) -> List[Tuple[str, float]]:
+        """Rank courses for a free-text query, best first, as (code, score).
 
-def get_course(courses: Dict[str, Any], subject_code: str) -> Optional[Any]:
-    """Get course by code with caching."""
-    course_codes_str = ','.join(courses.keys())
-    found_code = find_course_code(subject_code, course_codes_str)
-    return courses.get(found_code) if found_code else None
+        Courses where every query word prefixes some indexed word rank
+        first, by field weights; trigram matches fill the remaining slots.
+        An empty query lists the first courses by code, with score 0.
+        """
+        return list(self._search((query or "").strip().casefold(), limit))
+    
+    def _rank(self, query: str, limit: int) -> Tuple[Tuple[str, float], ...]:
+        if not query:
+            return tuple((code, 0.0) for code in sorted(self._codes)[:max(0, limit)])
+        words = search_tokens(query)
+        if not words or limit <= 0:
+            return ()
+        
+        scores: Optional[Dict[int, float]] = None
+        for word in words:
+            word_scores = self._word_scores(word)
+            scores = dict(word_scores) if scores is None else {
+                pos: score + word_scores[pos] for pos, score in scores.items() if pos in word_scores
+            }
+        
+        # Codes typed with separators ("19 AI 305") count as a code match for every word
+        code_weight = SEARCH_FIELD_WEIGHTS["code"] * len(words)
+        compact = compact_course_code(query)
+        for code in self.prefix(compact, limit=len(self._codes)) if len(words) > 1 else ():
+            pos = self._code_positions[code]
+            score = code_weight * (2 if compact_course_code(code) == compact else 1)
+            if scores.get(pos, 0) < score:
+                scores[pos] = score
+        
+        if len(scores) < limit:
+            grams = set().union(*(word_trigrams(word) for word in words))
+            counts: Dict[int, int] = defaultdict(int)
+            for gram in grams:
+                for pos in self._trigrams.get(gram, ()):
+                    counts[pos] += 1
+            needed = SEARCH_TRIGRAM_THRESHOLD * len(grams)
+            for pos, count in counts.items():
+                if pos not in scores and count >= needed:
+                    # Always below any prefix match
+                    scores[pos] = count / len(grams)
+        
+        best = heapq.nsmallest(limit, scores, key=lambda pos: (-scores[pos], self._codes[pos]))
+        return tuple((self._codes[pos], scores[pos]) for pos in best)
+    
+    def _score_word(self, word: str) -> Dict[int, int]:
+        """Best field weight per course for indexed words starting with `word`."""
+        word_scores: Dict[int, int] = {}
+        i = bisect.bisect_left(self._sorted_words, word)
+        while i < len(self._sorted_words) and self._sorted_words[i].startswith(word):
+            indexed = self._sorted_words[i]
+            factor = 2 if indexed == word else 1
+            for pos, weight in self._postings[indexed].items():
+                if word_scores.get(pos, 0) < weight * factor:
+                    word_scores[pos] = weight * factor
+            i += 1
+        return word_scores
 
 # ========== DATA STRUCTURES ==========
 @dataclass
@@ -500,6 +1242,14 @@ class CourseSection:
     faculty: str
     dept: str
     time_slots: List[TimeSlot]
+    # Id of the normalized faculty name in staff_table (assigned if not given)
+    staff_id: int = -1
+    # Position within its course's catalog sections (assigned by Course)
+    index: int = -1
+
+    def __post_init__(self):
+        if self.staff_id < 0:
+            self.staff_id = staff_table.id_for_faculty(self.faculty)
 
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -507,6 +1257,8 @@ class CourseSection:
             "section_code": self.section_code,
             "faculty": self.faculty,
             "dept": self.dept,
+            "staff_id": self.staff_id,
+            "index": self.index,
             "time_slots": [ts.to_dict() for ts in self.time_slots]
         }
 
@@ -527,6 +1279,19 @@ class CourseSection:
                     return True
         return False
 
+    @cached_property
+    def cell_mask(self) -> int:
+        """Grid cells (DAYS_ORDER x HOUR_SLOTS) this section occupies, one bit each."""
+        mask = 0
+        for slot in self.time_slots:
+            day_idx = DAY_INDEX.get(slot.day)
+            if day_idx is None:
+                continue
+            for hour_idx, (hs_min, he_min) in enumerate(HOUR_SLOT_MINUTES):
+                if max(slot.start_min, hs_min) < min(slot.end_min, he_min):
+                    mask |= 1 << (day_idx * len(HOUR_SLOTS) + hour_idx)
+        return mask
+
     def get_occupied_days(self) -> Set[str]:
         return {s.day for s in self.time_slots}
 
@@ -562,7 +1327,7 @@ class CourseSection:
         return self.faculty.strip() if self.faculty else "Unknown"
     
     def get_normalized_staff_name(self):
-        return normalize_staff_name(self.faculty)
+        return staff_table.name(self.staff_id)
 
 @dataclass
 class Course:
@@ -570,12 +1335,21 @@ class Course:
     name: str
     credits: str
     sections: List[CourseSection]
+    # "Type:" line, e.g. "OPEN ELECTIVE" or "PROFESSIONAL CORE"
+    course_type: str = ""
+
+    def __post_init__(self):
+        # Filtered copies keep the catalog positions of their sections
+        for i, section in enumerate(self.sections):
+            if section.index < 0:
+                section.index = i
 
     def to_dict(self) -> Dict[str, Any]:
         return {
             "code": self.code,
             "name": self.name,
             "credits": self.credits,
+            "type": self.course_type,
             "sections": [s.to_dict() for s in self.sections]
         }
 
@@ -602,6 +1376,10 @@ class TimetableWithViolations:
     def has_violations(self) -> bool:
         return len(self.violations) > 0
     
+    def section_indices(self) -> Tuple[int, ...]:
+        """Compact form: the chosen section index of each course, in search order."""
+        return tuple(s.index for s in self.sections)
+    
     def to_dict(self) -> Dict[str, Any]:
         return {
             "sections": [s.to_dict() for s in self.sections],
@@ -609,233 +1387,814 @@ class TimetableWithViolations:
         }
 
 # ========== PARSER ==========
+# Line kinds the parser cares about; everything else is skipped
+_LINE_KIND_RE = re.compile(
+    r'(subject|course name|type|section|' + '|'.join(d.lower() for d in DAYS_ORDER) + r'):',
+    re.IGNORECASE
+)
+_SUBJECT_RE = re.compile(r'^\s*([^\s]+)(?:\s+\[(\d+)\s+Credits\])?', re.IGNORECASE)
+# Metadata lines right after a section header (matched anywhere in the line)
+_SECTION_META_RE = re.compile(r'date:|type:|status:', re.IGNORECASE)
+_DAY_BY_KEY = {d.lower(): d for d in DAYS_ORDER}
+
+@lru_cache(maxsize=4096)
+def parse_day_times(times_part: str) -> Tuple[Tuple[Tuple[int, int], ...], Tuple[str, ...]]:
+    """Parse the text after "<Day>:" into (start_min, end_min) pairs.
+
+    Memoized: catalogs repeat the same handful of time strings thousands
+    of times. Returns tuples so cached values can't be mutated.
+    """
+    ranges, warnings = parse_time_range_string(times_part)
+    spans = []
+    for s, e in ranges:
+        smin = time_to_minutes(s)
+        emin = time_to_minutes(e)
+        if smin < emin:
+            spans.append((smin, emin))
+        else:
+            warnings.append(f"Invalid time range {s}-{e}")
+    return tuple(spans), tuple(warnings)
+
 def parse_output_txt(text: str) -> Dict[str, Course]:
-    """Parse output.txt content into Course objects."""
+    """Parse output.txt content into Course objects.
+
+    Single pass over the lines: each line is stripped once and classified
+    with one precompiled pattern, and time strings go through the
+    parse_day_times memo table.
+    """
     if not text:
         return {}
     
     courses: Dict[str, Course] = {}
+    for course in iter_courses(text.splitlines()):
+        courses[course.code] = course
+    return courses
+
+def iter_courses(lines: Iterable[str]) -> Iterator[Course]:
+    """Stream Course objects out of output.txt lines.
+
+    Each course is yielded as soon as its "Subject:" block closes and parse
+    warnings are logged as they occur, so memory use is bounded by one
+    block regardless of input size. Courses without sections are skipped.
+    """
     current_subject = None
     current_name = ""
     current_credits = ""
+    current_type = ""
     current_sections: List[CourseSection] = []
-    lines = text.splitlines()
-    i = 0
-    parse_warnings: List[str] = []
     
-    while i < len(lines):
-        line = lines[i].strip()
-        
-        # Subject detection
-        if line.lower().startswith("subject:"):
-            if current_subject is not None and current_sections:
-                courses[current_subject] = Course(
-                    code=current_subject,
-                    name=current_name,
-                    credits=current_credits,
-                    sections=current_sections.copy()
+    # Open section state
+    section_code = None
+    dept = faculty = ""
+    time_slots: List[TimeSlot] = []
+    skipping_meta = False
+    
+    def close_section():
+        if time_slots:
+            current_sections.append(
+                CourseSection(
+                    subject_code=current_subject or "",
+                    section_code=section_code,
+                    faculty=faculty,
+                    dept=dept,
+                    time_slots=time_slots
                 )
+            )
+        else:
+            logger.warning(f"Parse warning: Section {section_code} has no valid time slots")
+    
+    def closed_course() -> Optional[Course]:
+        if current_subject is not None and current_sections:
+            # Without a "Course Name:" line the code doubles as the name
+            return Course(
+                code=current_subject,
+                name=current_name or current_subject,
+                credits=current_credits,
+                sections=current_sections,
+                course_type=current_type
+            )
+        if current_subject is not None:
+            logger.warning(f"Course {current_subject} has no sections, removing")
+        return None
+    
+    for lineno, raw in enumerate(lines, start=1):
+        line = raw.strip()
+        
+        if section_code is not None:
+            if skipping_meta and _SECTION_META_RE.search(line):
+                continue
+            skipping_meta = False
             
-            current_sections = []
+            m = _LINE_KIND_RE.match(line)
+            kind = m.group(1).lower() if m else None
+            if line and kind not in ("section", "subject"):
+                day = _DAY_BY_KEY.get(kind)
+                if day:
+                    spans, warnings = parse_day_times(line[m.end():].strip())
+                    for warning in warnings:
+                        logger.warning(f"Parse warning: {warning} for {day}")
+                    time_slots.extend(
+                        TimeSlot(
+                            day=day,
+                            start_min=smin,
+                            end_min=emin,
+                            subject_code=current_subject or "",
+                            section_code=section_code,
+                            faculty=faculty
+                        )
+                        for smin, emin in spans
+                    )
+                continue
             
-            # Extract after "subject:"
-            colon_idx = line.lower().find("subject:")
-            after_subject = line[colon_idx + len("subject:"):].strip()
+            close_section()
+            section_code = None
+            if not line:
+                continue
+        else:
+            m = _LINE_KIND_RE.match(line)
+            kind = m.group(1).lower() if m else None
+        
+        # Subject detection
+        if kind == "subject":
+            course = closed_course()
+            if course is not None:
+                yield course
+            current_sections = []
             
             # Try to match course code and credits
-            m = re.match(r'^\s*([^\s]+)(?:\s+\[(\d+)\s+Credits\])?', after_subject, re.IGNORECASE)
-            if m:
-                current_subject = normalize_course_code(m.group(1))
-                current_credits = m.group(2) or ""
+            after_subject = line[m.end():].strip()
+            sm = _SUBJECT_RE.match(after_subject)
+            if sm:
+                current_subject = normalize_course_code(sm.group(1))
+                current_credits = sm.group(2) or ""
             else:
                 # Fallback
                 parts = after_subject.split()
                 current_subject = normalize_course_code(parts[0]) if parts else "UNKNOWN"
                 current_credits = ""
                 if not parts:
-                    parse_warnings.append(f"Empty subject at line {i+1}")
+                    logger.warning(f"Parse warning: Empty subject at line {lineno}")
             
             current_name = ""
-            i += 1
+            current_type = ""
         
         # Course name detection
-        elif line.lower().startswith("course name:"):
-            colon_idx = line.lower().find("course name:")
-            current_name = line[colon_idx + len("course name:"):].strip()
-            i += 1
+        elif kind == "course name":
+            current_name = line[m.end():].strip()
         
-        # Section detection
-        elif line.lower().startswith("section:"):
-            section_code, dept, faculty = parse_section_line(line)
-            if not section_code:
-                i += 1
-                continue
-            
-            i += 1
-            # Skip metadata lines
-            while i < len(lines) and any(k.lower() in lines[i].lower() 
-                                        for k in ("Date:", "Type:", "Status:")):
-                i += 1
-            
-            time_slots: List[TimeSlot] = []
-            while i < len(lines):
-                cur = lines[i].strip()
-                cur_lower = cur.lower()
-                
-                # Break if next section or subject
-                if not cur or cur_lower.startswith("section:") or cur_lower.startswith("subject:"):
-                    break
-                
-                # Day matching
-                day_found = None
-                for day in DAYS_ORDER:
-                    if cur_lower.startswith(day.lower() + ":"):
-                        day_found = day
-                        break
-                
-                if day_found:
-                    colon_idx = cur_lower.find(":")
-                    times_part = cur[colon_idx + 1:].strip()
-                    ranges, warnings = parse_time_range_string(times_part)
-                    parse_warnings.extend(warnings)
-                    
-                    for s, e in ranges:
-                        smin = time_to_minutes(s)
-                        emin = time_to_minutes(e)
-                        if smin < emin:
-                            time_slots.append(
-                                TimeSlot(
-                                    day=day_found,
-                                    start_min=smin,
-                                    end_min=emin,
-                                    subject_code=current_subject or "",
-                                    section_code=section_code,
-                                    faculty=faculty
-                                )
-                            )
-                        else:
-                            parse_warnings.append(f"Invalid time range {s}-{e} for {day_found}")
-                
-                i += 1
-            
-            if time_slots:
-                current_sections.append(
-                    CourseSection(
-                        subject_code=current_subject or "",
-                        section_code=section_code,
-                        faculty=faculty,
-                        dept=dept,
-                        time_slots=time_slots
-                    )
-                )
-            else:
-                parse_warnings.append(f"Section {section_code} has no valid time slots")
+        elif kind == "type":
+            current_type = line[m.end():].strip()
         
-        else:
-            i += 1
+        # Section detection
+        elif kind == "section":
+            code, dept, faculty = parse_section_line(line)
+            if code:
+                section_code = code
+                time_slots = []
+                skipping_meta = True
     
+    if section_code is not None:
+        close_section()
     # Add the last course
-    if current_subject is not None and current_sections:
-        courses[current_subject] = Course(
-            code=current_subject,
-            name=current_name or current_subject,
-            credits=current_credits,
-            sections=current_sections.copy()
-        )
-    
-    # Log warnings
-    for warning in parse_warnings:
-        logger.warning(f"Parse warning: {warning}")
+    course = closed_course()
+    if course is not None:
+        yield course
+
+# ========== INCREMENTAL PARSING ==========
+def iter_subject_blocks(lines: Iterable[str]) -> Iterator[str]:
+    """Group lines into "Subject:" blocks, yielding each as soon as it closes.
+
+    Line endings are dropped, so blocks read from a file hash the same as
+    blocks split from text. Anything before the first subject line is
+    ignored, as it is by parse_output_txt.
+    """
+    current: Optional[List[str]] = None
     
-    # Filter out courses without sections
-    for code in list(courses.keys()):
-        if not courses[code].sections:
-            logger.warning(f"Course {code} has no sections, removing")
-            del courses[code]
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line.lstrip()[:8].lower() == "subject:":
+            if current is not None:
+                yield "\n".join(current)
+            current = [line]
+        elif current is not None:
+            current.append(line)
     
-    return courses
+    if current is not None:
+        yield "\n".join(current)
 
-# ========== CACHING ==========
-def load_courses(force_reload: bool = False) -> Dict[str, Course]:
-    """Load courses with caching and file monitoring."""
-    # Check cache first
-    cached = course_cache.get()
-    if cached is not None and not force_reload:
-        return cached
-    
-    if not os.path.exists(OUTPUT_FILE):
-        logger.error(f"{OUTPUT_FILE} not found!")
-        return {}
+def split_subject_blocks(text: str) -> List[str]:
+    """Split output.txt content into one chunk per "Subject:" block."""
+    return list(iter_subject_blocks(text.splitlines()))
+
+def iter_catalog_file(path: str) -> Iterator[Course]:
+    """Stream normalized courses from a catalog file, one block at a time."""
+    with open(path, "r", encoding="utf-8") as f:
+        for course in iter_courses(f):
+            course = normalize_course(course)
+            if course is not None:
+                yield course
+
+def hash_block(block: str) -> str:
+    """Content hash identifying an unchanged subject block across reloads."""
+    return hashlib.blake2b(block.encode("utf-8"), digest_size=16).hexdigest()
+
+def normalize_course(course: Course) -> Optional[Course]:
+    """Normalize the code and drop sections without time slots.
+
+    Returns None if no section is left.
+    """
+    norm = normalize_course_code(course.code)
+    course.code = norm
+    for section in course.sections:
+        section.subject_code = norm
     
-    try:
-        with open(OUTPUT_FILE, 'r', encoding='utf-8') as f:
-            content = f.read()
+    course.sections = [s for s in course.sections if s.time_slots]
+    if not course.sections:
+        logger.warning(f"Course {norm} excluded: all sections have no time slots")
+        return None
+    for i, section in enumerate(course.sections):
+        section.index = i
+    return course
+
+def normalize_parsed_courses(raw: Dict[str, Course]) -> Dict[str, Course]:
+    """Normalize codes and drop sections/courses without time slots."""
+    normalized: Dict[str, Course] = {}
+    for course in raw.values():
+        course = normalize_course(course)
+        if course is not None:
+            normalized[course.code] = course
+    return normalized
+
+def parse_blocks_incremental(
+    blocks: Iterable[str],
+    previous: Optional[CatalogSnapshot] = None
+) -> Tuple[Dict[str, Course], Dict[str, str], int, int]:
+    """Parse subject blocks, reusing Course objects for unchanged blocks.
+
+    `blocks` may be a lazy iterator (see iter_subject_blocks), in which
+    case only one block's text is held at a time.
+
+    Returns (courses, block_hashes, block_count, reparsed_block_count).
+    Reused courses are shared with the previous snapshot and must not be
+    mutated.
+    """
+    reusable: Dict[str, Course] = {}
+    if previous is not None:
+        for code, block_hash in previous.block_hashes.items():
+            if code in previous.courses:
+                reusable[block_hash] = previous.courses[code]
+    
+    courses: Dict[str, Course] = {}
+    block_hashes: Dict[str, str] = {}
+    total = reparsed = 0
+    
+    for block in blocks:
+        total += 1
+        block_hash = hash_block(block)
+        course = reusable.get(block_hash)
+        if course is not None:
+            courses[course.code] = course
+            block_hashes[course.code] = block_hash
+            continue
+        
+        reparsed += 1
+        for parsed in iter_courses(block.split("\n")):
+            parsed = normalize_course(parsed)
+            if parsed is not None:
+                courses[parsed.code] = parsed
+                block_hashes[parsed.code] = block_hash
+    
+    return courses, block_hashes, total, reparsed
+
+def _section_keys(course: Course) -> Dict[str, Dict[str, Any]]:
+    """Key a course's sections by section code (disambiguating repeats)."""
+    keyed: Dict[str, Dict[str, Any]] = {}
+    for section in course.sections:
+        key = section.section_code
+        n = 2
+        while key in keyed:
+            key = f"{section.section_code}#{n}"
+            n += 1
+        keyed[key] = section.to_dict()
+    return keyed
+
+def diff_catalogs(old: Dict[str, Course], new: Dict[str, Course]) -> CatalogDiff:
+    """Structured diff of added, removed and changed courses and sections."""
+    diff = CatalogDiff(
+        added=sorted(set(new) - set(old)),
+        removed=sorted(set(old) - set(new))
+    )
+    
+    for code in sorted(set(old) & set(new)):
+        before, after = old[code], new[code]
+        # Reused objects come from identical blocks
+        if before is after:
+            continue
+        
+        old_sections = _section_keys(before)
+        new_sections = _section_keys(after)
+        sections_changed = [
+            key for key in old_sections
+            if key in new_sections and old_sections[key] != new_sections[key]
+        ]
+        sections_added = [key for key in new_sections if key not in old_sections]
+        sections_removed = [key for key in old_sections if key not in new_sections]
+        metadata_changed = ((before.name, before.credits, before.course_type)
+                            != (after.name, after.credits, after.course_type))
+        
+        if sections_added or sections_removed or sections_changed or metadata_changed:
+            diff.changed[code] = {
+                "sections_added": sections_added,
+                "sections_removed": sections_removed,
+                "sections_changed": sections_changed
+            }
+    
+    return diff
+
+# ========== COMPILED CATALOG ==========
+# Layout (little-endian): header, string offsets (n_strings + 1 x u32),
+# UTF-8 string blob, course table, section table, slot table. All text is
+# interned in the string table; the tables only hold integers.
+CATALOG_MAGIC = b"TTCATLG\0"
+CATALOG_FORMAT_VERSION = 3
+_CATALOG_HEADER = struct.Struct("<8sI32sIIII")   # magic, format, source sha256, counts
+_CATALOG_COURSE = struct.Struct("<IIIIIII")      # code, name, credits, type, block hash, first section, n
+_CATALOG_SECTION = struct.Struct("<IIIII")       # section, faculty, dept, first slot, n
+_CATALOG_SLOT = struct.Struct("<BHH")            # day index, start minute, end minute
+
+def file_checksum(path: str) -> bytes:
+    """Checksum of the raw catalog text, stored to detect stale compiled files."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+def write_compiled_catalog(courses: Dict[str, Course], block_hashes: Dict[str, str],
+                           checksum: bytes, path: str):
+    """Write courses to a compiled catalog file (atomically, via rename)."""
+    strings: List[str] = []
+    string_ids: Dict[str, int] = {}
+    
+    def intern(value: str) -> int:
+        sid = string_ids.get(value)
+        if sid is None:
+            sid = string_ids[value] = len(strings)
+            strings.append(value)
+        return sid
+    
+    course_rows = bytearray()
+    section_rows = bytearray()
+    slot_rows = bytearray()
+    n_sections = n_slots = 0
+    
+    for code, course in courses.items():
+        course_rows += _CATALOG_COURSE.pack(
+            intern(code), intern(course.name), intern(course.credits), intern(course.course_type),
+            intern(block_hashes.get(code, "")), n_sections, len(course.sections)
+        )
+        for section in course.sections:
+            section_rows += _CATALOG_SECTION.pack(
+                intern(section.section_code), intern(section.faculty), intern(section.dept),
+                n_slots, len(section.time_slots)
+            )
+            n_sections += 1
+            for slot in section.time_slots:
+                slot_rows += _CATALOG_SLOT.pack(DAY_INDEX[slot.day], slot.start_min, slot.end_min)
+                n_slots += 1
+    
+    blob = bytearray()
+    offsets = [0]
+    for value in strings:
+        blob += value.encode("utf-8")
+        offsets.append(len(blob))
+    
+    header = _CATALOG_HEADER.pack(
+        CATALOG_MAGIC, CATALOG_FORMAT_VERSION, checksum,
+        len(strings), len(courses), n_sections, n_slots
+    )
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(struct.pack(f"<{len(offsets)}I", *offsets))
+        f.write(blob)
+        f.write(course_rows)
+        f.write(section_rows)
+        f.write(slot_rows)
+    os.replace(tmp_path, path)
+
+class CompiledCatalog:
+    """Read-only, memory-mapped view of a compiled catalog file.
+
+    A load format only: load() materializes Course objects without any
+    text parsing, and the mapping is closed once they are built.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
         
-        raw = parse_output_txt(content)
-        normalized: Dict[str, Course] = {}
+        try:
+            magic, fmt, checksum, n_strings, n_courses, n_sections, n_slots = \
+                _CATALOG_HEADER.unpack_from(self._mm, 0)
+            if magic != CATALOG_MAGIC:
+                raise ValueError(f"{path} is not a compiled catalog")
+            if fmt != CATALOG_FORMAT_VERSION:
+                raise ValueError(f"{path} has format {fmt}, expected {CATALOG_FORMAT_VERSION}")
+            
+            self.checksum = checksum
+            offset = _CATALOG_HEADER.size
+            string_offsets = struct.unpack_from(f"<{n_strings + 1}I", self._mm, offset)
+            offset += 4 * (n_strings + 1)
+            blob = self._mm[offset:offset + string_offsets[-1]]
+            self.strings = [
+                blob[string_offsets[i]:string_offsets[i + 1]].decode("utf-8")
+                for i in range(n_strings)
+            ]
+            offset += string_offsets[-1]
+            
+            self._courses_at = offset
+            self._sections_at = self._courses_at + n_courses * _CATALOG_COURSE.size
+            self._slots_at = self._sections_at + n_sections * _CATALOG_SECTION.size
+            end = self._slots_at + n_slots * _CATALOG_SLOT.size
+            if end != len(self._mm):
+                raise ValueError(f"{path} is truncated or corrupt")
+            self.n_courses = n_courses
+        except Exception:
+            self.close()
+            raise
+    
+    def close(self):
+        self._mm.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def load(self, previous: Optional[CatalogSnapshot] = None) -> Tuple[Dict[str, Course], Dict[str, str]]:
+        """Materialize all courses, reusing unchanged ones from `previous`."""
+        strings = self.strings
+        courses: Dict[str, Course] = {}
+        block_hashes: Dict[str, str] = {}
         
-        for code, course in raw.items():
-            norm = normalize_course_code(code)
-            course.code = norm
-            for section in course.sections:
-                section.subject_code = norm
+        for i in range(self.n_courses):
+            code_id, name_id, credits_id, type_id, hash_id, first_section, n_sections = \
+                _CATALOG_COURSE.unpack_from(self._mm, self._courses_at + i * _CATALOG_COURSE.size)
+            code = strings[code_id]
+            block_hash = strings[hash_id]
+            block_hashes[code] = block_hash
             
-            course.sections = [s for s in course.sections if s.time_slots]
-            if course.sections:
-                normalized[norm] = course
-            else:
-                logger.warning(f"Course {norm} excluded: all sections have no time slots")
+            if (previous is not None and block_hash
+                    and previous.block_hashes.get(code) == block_hash and code in previous.courses):
+                courses[code] = previous.courses[code]
+                continue
+            
+            sections = []
+            for j in range(first_section, first_section + n_sections):
+                section_id, faculty_id, dept_id, first_slot, n_slots = \
+                    _CATALOG_SECTION.unpack_from(self._mm, self._sections_at + j * _CATALOG_SECTION.size)
+                section_code = strings[section_id]
+                faculty = strings[faculty_id]
+                time_slots = [
+                    TimeSlot(
+                        day=DAYS_ORDER[day_idx],
+                        start_min=start_min,
+                        end_min=end_min,
+                        subject_code=code,
+                        section_code=section_code,
+                        faculty=faculty
+                    )
+                    for day_idx, start_min, end_min in _CATALOG_SLOT.iter_unpack(
+                        self._mm[self._slots_at + first_slot * _CATALOG_SLOT.size:
+                                 self._slots_at + (first_slot + n_slots) * _CATALOG_SLOT.size]
+                    )
+                ]
+                sections.append(CourseSection(
+                    subject_code=code,
+                    section_code=section_code,
+                    faculty=faculty,
+                    dept=strings[dept_id],
+                    time_slots=time_slots
+                ))
+            
+            courses[code] = Course(code=code, name=strings[name_id],
+                                   credits=strings[credits_id], sections=sections,
+                                   course_type=strings[type_id])
+        
+        return courses, block_hashes
+
+def load_compiled_catalog(path: str, checksum: bytes,
+                          previous: Optional[CatalogSnapshot] = None
+                          ) -> Optional[Tuple[Dict[str, Course], Dict[str, str]]]:
+    """Load a compiled catalog if it exists and was built from `checksum`."""
+    if not path or not os.path.exists(path):
+        return None
+    
+    try:
+        with CompiledCatalog(path) as compiled:
+            if compiled.checksum != checksum:
+                logger.info(f"Compiled catalog {path} is stale, parsing the source")
+                return None
+            return compiled.load(previous)
+    except (OSError, ValueError, struct.error) as e:
+        logger.warning(f"Ignoring compiled catalog {path}: {e}")
+        return None
+
+def compile_catalog(source: str, output: str) -> Tuple[int, int]:
+    """Parse `source` and write its compiled form to `output`.
+
+    Returns (course_count, section_count).
+    """
+    checksum = file_checksum(source)
+    with open(source, "r", encoding="utf-8") as f:
+        courses, block_hashes, _, _ = parse_blocks_incremental(iter_subject_blocks(f))
+    write_compiled_catalog(courses, block_hashes, checksum, output)
+    return len(courses), sum(len(c.sections) for c in courses.values())
+
+# ========== CACHING ==========
+def build_catalog(
+    cache: CourseCache,
+    previous: Optional[CatalogSnapshot] = None
+) -> Optional[Tuple[Dict[str, Course], Dict[str, str], float]]:
+    """Read and parse a catalog file without touching the active snapshot.
+
+    Uses the compiled catalog when its checksum matches the file; otherwise
+    only subject blocks whose content changed since `previous` are parsed.
+    """
+    if not os.path.exists(cache.path):
+        logger.error(f"{cache.path} not found!")
+        return None
+    
+    # Take mtime before reading so a write racing with us triggers another reload
+    source_mtime = os.path.getmtime(cache.path)
+    compiled = load_compiled_catalog(cache.compiled_path, file_checksum(cache.path), previous)
+    if compiled is not None:
+        courses, block_hashes = compiled
+        logger.info(f"Loaded compiled catalog {cache.compiled_path}")
+        return courses, block_hashes, source_mtime
+    
+    # Stream the file block by block rather than reading it whole
+    with open(cache.path, 'r', encoding='utf-8') as f:
+        courses, block_hashes, total, reparsed = parse_blocks_incremental(iter_subject_blocks(f), previous)
+    logger.info(f"Parsed {reparsed} of {total} subject blocks ({total - reparsed} unchanged)")
+    
+    return courses, block_hashes, source_mtime
+
+def load_catalog(force_reload: bool = False, catalog_id: Optional[str] = None) -> Optional[CatalogSnapshot]:
+    """Return a catalog's current snapshot, building a new version if needed.
+
+    `catalog_id` defaults to DEFAULT_CATALOG; unknown ids raise KeyError.
+    A failed or empty parse never replaces a previously valid snapshot.
+    """
+    cache = catalog_registry.cache_for(catalog_id)
+    if not force_reload:
+        cached = cache.get()
+        if cached is not None:
+            catalog_registry.touch(cache.catalog_id)
+            return cached
+    
+    with cache.reload_lock:
+        # Another thread may have finished the reload while we waited
+        if not force_reload:
+            cached = cache.get()
+            if cached is not None:
+                return cached
+        
+        previous = cache.get()
+        try:
+            built = build_catalog(cache, previous)
+        except Exception as e:
+            logger.error(f"Error loading courses: {e}", exc_info=True)
+            built = None
+        
+        if not built or not built[0]:
+            if previous is not None:
+                logger.warning(f"Catalog reload produced no courses, keeping version {previous.version}")
+            return previous
         
-        # Update cache
-        course_cache.set(normalized)
+        courses, block_hashes, source_mtime = built
+        diff = diff_catalogs(previous.courses, courses) if previous is not None else None
+        snapshot = cache.swap(courses, source_mtime, block_hashes, diff, prepare=prepare_catalog_responses)
+        result_cache.apply_catalog_update(cache.catalog_id, snapshot.version, diff)
+        catalog_registry.note_loaded(cache.catalog_id)
         
-        logger.info(f"Loaded {len(normalized)} courses")
-        total_sections = sum(len(c.sections) for c in normalized.values())
+        logger.info(f"Loaded {len(courses)} courses (catalog {cache.catalog_id}, version {snapshot.version})")
+        if diff is not None:
+            logger.info(
+                f"Catalog diff: {len(diff.added)} added, {len(diff.removed)} removed, "
+                f"{len(diff.changed)} changed"
+            )
+        total_sections = sum(len(c.sections) for c in courses.values())
         logger.info(f"Total sections: {total_sections}")
         
-        return normalized
+        return snapshot
+
+def load_courses(force_reload: bool = False, catalog_id: Optional[str] = None) -> Dict[str, Course]:
+    """Load courses with caching and file monitoring."""
+    snapshot = load_catalog(force_reload, catalog_id)
+    return snapshot.courses if snapshot else {}
+
+async def get_catalog(catalog_id: Optional[str] = None) -> Optional[CatalogSnapshot]:
+    """Get a catalog snapshot for a request without parsing on the event loop.
+
+    Normally a plain read of the active snapshot; file changes are picked
+    up by the registry's watchers, which swap in new versions in the
+    background. Only a catalog that isn't loaded yet is parsed here, in a
+    worker thread.
+    """
+    cache = catalog_registry.cache_for(catalog_id)
+    cached = cache.get()
+    if cached is not None:
+        catalog_registry.touch(cache.catalog_id)
+        return cached
     
-    except Exception as e:
-        logger.error(f"Error loading courses: {e}", exc_info=True)
-        # Don't cache errors
-        course_cache.clear()
-        return {}
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, partial(load_catalog, False, cache.catalog_id))
 
 # ========== SCORING ==========
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Below this many results plain Python ranks as fast as NumPy
+NUMPY_RANK_MIN = 2000
+
+class TimetableScorer:
+    """Per-request timetable scoring (lower is better).
+
+    Morning, evening and staff contributions depend only on the section,
+    so each course gets a score vector indexed by section index, computed
+    once; a timetable's score is the sum over its section indices plus
+    its violation penalty. Scores are kept in thousandths so these sums
+    are exact (staff ranks add 0.001 each).
+    """
+    SCALE = 1000
+    
+    def __init__(self, morning_weight: float = 1.0, evening_weight: float = 1.0,
+                 staff_ranks: Dict[str, Dict[int, int]] = None, staff_strictness: str = "strict"):
+        self.morning_weight = morning_weight
+        self.evening_weight = evening_weight
+        self.staff_ranks = staff_ranks or {}
+        self.staff_penalty = (1000 if staff_strictness == "strict" else 10) * self.SCALE
+        self._vectors: Dict[str, List[float]] = {}
+    
+    def section_score(self, section: CourseSection) -> float:
+        score = (section.morning_slot_count() * self.morning_weight
+                 + section.evening_slot_count() * self.evening_weight) * self.SCALE
+        ranks = self.staff_ranks.get(section.subject_code)
+        if ranks is not None:
+            position = ranks.get(section.staff_id)
+            score += position if position is not None else self.staff_penalty
+        return score
+    
+    def course_vector(self, course: Course) -> List[float]:
+        vector = self._vectors.get(course.code)
+        if vector is None:
+            vector = self._vectors[course.code] = [self.section_score(s) for s in course.sections]
+        return vector
+    
+    def violation_score(self, violations: List[ConstraintViolation]) -> float:
+        return sum((6 - v.priority) * 100 for v in violations) * self.SCALE if violations else 0
+    
+    def score(self, selection: List[CourseSection], violations: List[ConstraintViolation] = None) -> float:
+        """Score one selection, in the same units as score_timetable."""
+        total = sum(self.section_score(s) for s in selection) + self.violation_score(violations)
+        return total / self.SCALE
+    
+    def rank(self, timetables: List[TimetableWithViolations], courses: Dict[str, Course],
+             limit: Optional[int] = None) -> List[TimetableWithViolations]:
+        """Best-first order of `timetables`, or only the best `limit` of them.
+
+        Ties keep search order. `courses` must be the catalog the section
+        indices refer to.
+        """
+        if not timetables:
+            return []
+        n = len(timetables)
+        if limit is None or limit > n:
+            limit = n
+        
+        # Every timetable lists one section per course, in the same course order
+        vectors = [self.course_vector(courses[s.subject_code]) for s in timetables[0].sections]
+        penalties = [self.violation_score(t.violations) for t in timetables]
+        
+        if np is not None and n >= NUMPY_RANK_MIN:
+            indices = np.array([t.section_indices() for t in timetables], dtype=np.intp)
+            scores = np.array(penalties, dtype=np.float64)
+            for column, vector in enumerate(vectors):
+                scores += np.asarray(vector, dtype=np.float64)[indices[:, column]]
+            if limit < n:
+                # Everything below the k-th score, then ties in search order
+                kth = np.partition(scores, limit - 1)[limit - 1]
+                below = np.flatnonzero(scores < kth)
+                ties = np.flatnonzero(scores == kth)[:limit - len(below)]
+                top = np.concatenate([below, ties])
+                order = top[np.lexsort((top, scores[top]))]
+            else:
+                order = np.argsort(scores, kind="stable")
+            return [timetables[i] for i in order.tolist()]
+        
+        scores = self._scaled_scores(timetables, vectors, penalties)
+        if limit < n:
+            order = heapq.nsmallest(limit, range(n), key=scores.__getitem__)
+        else:
+            order = sorted(range(n), key=scores.__getitem__)
+        return [timetables[i] for i in order]
+    
+    def scores(self, timetables: List[TimetableWithViolations],
+               courses: Dict[str, Course]) -> List[float]:
+        """Score of each timetable, in the same units as score()."""
+        if not timetables:
+            return []
+        vectors = [self.course_vector(courses[s.subject_code]) for s in timetables[0].sections]
+        penalties = [self.violation_score(t.violations) for t in timetables]
+        return [score / self.SCALE for score in self._scaled_scores(timetables, vectors, penalties)]
+    
+    @staticmethod
+    def _scaled_scores(timetables, vectors, penalties) -> List[float]:
+        return [
+            penalty + sum(vector[i] for vector, i in zip(vectors, t.section_indices()))
+            for t, penalty in zip(timetables, penalties)
+        ]
+
 def score_timetable(selection: List[CourseSection],
                 morning_weight: float = 1.0,
                 evening_weight: float = 1.0,
                 staff_preferences: Dict[str, List[str]] = None,
                 staff_strictness: str = "strict",
-                constraint_violations: List[ConstraintViolation] = None):
-    morning_count = sum(sec.morning_slot_count() for sec in selection)
-    evening_count = sum(sec.evening_slot_count() for sec in selection)
-    
-    score = morning_count * morning_weight + evening_count * evening_weight
-    
-    if staff_preferences:
-        for section in selection:
-            course_code = section.subject_code
-            if course_code in staff_preferences:
-                staff_name = section.get_normalized_staff_name()
-                if staff_name in staff_preferences[course_code]:
-                    position = staff_preferences[course_code].index(staff_name)
-                    score += position * 0.001
-                else:
-                    if staff_strictness == "strict":
-                        score += 1000
-                    else:
-                        score += 10
+                constraint_violations: List[ConstraintViolation] = None,
+                staff_ranks: Dict[str, Dict[int, int]] = None):
+    """Score a single timetable; use TimetableScorer.rank for result sets."""
+    if staff_ranks is None:
+        staff_ranks = compile_staff_preferences(staff_preferences)
+    scorer = TimetableScorer(morning_weight, evening_weight, staff_ranks, staff_strictness)
+    return scorer.score(selection, constraint_violations)
+
+def select_diverse(timetables: List[TimetableWithViolations], count: int,
+                   pool: int = DIVERSE_POOL) -> List[TimetableWithViolations]:
+    """Up to `count` of the first `pool` ranked timetables, as different
+    from each other as possible, in rank order.
+
+    Greedy max-min: starting from the best, each pick is the timetable
+    farthest from its nearest earlier pick (ties to the better ranked).
+    Each timetable is one int, a bit per (course, section) chosen and per
+    grid cell occupied, so distance is the popcount of an xor: two per
+    course with a different section plus one per cell only one occupies.
+    """
+    candidates = timetables[:pool]
+    if len(candidates) <= count:
+        return list(candidates)
+    choices = [t.section_indices() for t in candidates]
+    offsets = [0]
+    for position in range(len(choices[0])):
+        offsets.append(offsets[-1] + max(c[position] for c in choices) + 1)
+    signatures = []
+    for timetable, chosen in zip(candidates, choices):
+        signature = 0
+        for section in timetable.sections:
+            signature |= section.cell_mask
+        signature <<= offsets[-1]
+        for offset, index in zip(offsets, chosen):
+            signature |= 1 << (offset + index)
+        signatures.append(signature)
     
-    if constraint_violations:
-        sorted_violations = sorted(constraint_violations, key=lambda v: v.priority)
-        for i, violation in enumerate(sorted_violations):
-            priority_multiplier = 6 - violation.priority
-            score += priority_multiplier * 100
+    def distances(i: int) -> List[int]:
+        signature = signatures[i]
+        return [(signature ^ other).bit_count() for other in signatures]
     
-    return score
+    picked = [0]
+    nearest = distances(0)
+    while len(picked) < count:
+        best = max(range(len(candidates)), key=lambda i: (nearest[i], -i))
+        if nearest[best] == 0:
+            break  # Only repeats of earlier picks left
+        picked.append(best)
+        nearest = [min(d, e) for d, e in zip(nearest, distances(best))]
+    return [candidates[i] for i in sorted(picked)]
 
 # ========== GOD MODE FINDER ==========
+@dataclass
+class SearchCheckpoint:
+    """Where a search stopped early (timeout or result limit), to resume from.
+
+    `cursors` are positions in each course's sections in search order: the
+    DFS path to the first unexplored node (recursive strategy), or the
+    digits of the next combination (bitmask strategy). `mask` is the time
+    bitmask occupied along that DFS path. Counters are totals over every
+    run of the search so far.
+    """
+    strategy: str
+    cursors: List[int]
+    mask: int
+    # Sections per course after filtering, in search order
+    sizes: List[int]
+    combinations_tried: int
+    found: int
+    time_elapsed: float = 0.0
+
 class GodModeTimetableFinder:
     def __init__(self, courses: Dict[str, Course], selected_codes: List[str], 
                 max_results: int = 10000, timeout: int = TIMETABLE_TIMEOUT):
@@ -845,6 +2204,12 @@ class GodModeTimetableFinder:
         self.timeout = timeout
         self.course_list = [courses[c] for c in selected_codes if c in courses]
         self.all_timetables: List[TimetableWithViolations] = []
+        # Called with each timetable as it is found (streaming searches)
+        self.result_listener: Optional[Callable[[TimetableWithViolations], None]] = None
+        # Continue an earlier search of the same courses and constraints
+        self.resume_from: Optional[SearchCheckpoint] = None
+        # Set if this search stops before exhausting the search space
+        self.checkpoint: Optional[SearchCheckpoint] = None
         
         # Thread safety
         self._lock = threading.Lock()
@@ -890,6 +2255,8 @@ class GodModeTimetableFinder:
             
             self.stats['valid_timetables'] += 1
         
+        if self.result_listener is not None:
+            self.result_listener(timetable)
         return timetable
 
     def find_all_timetables(
@@ -903,9 +2270,15 @@ class GodModeTimetableFinder:
         staff_preferences: Dict[str, List[str]] = None,
         priority_mode: str = 'staff',
         staff_strictness: str = 'strict',
-        constraints_strictness: str = 'strict'
+        constraints_strictness: str = 'strict',
+        sample: bool = False,
+        sample_seed: Optional[int] = None
     ) -> Tuple[List[TimetableWithViolations], List[Dict[str, Any]], List[Dict[str, Any]], Dict[str, Any]]:
-        """Find all valid timetables with given constraints."""
+        """Find all valid timetables with given constraints.
+
+        With `sample`, draw up to max_results of them uniformly at random
+        instead (see _find_all_sampled).
+        """
         with self._lock:
             self.all_timetables = []
             self.staff_warnings = []
@@ -918,35 +2291,19 @@ class GodModeTimetableFinder:
             self.stats['search_strategy'] = ''
             self.stats['pruned_combinations'] = 0
         
+        self.staff_ranks = compile_staff_preferences(staff_preferences)
+        
         logger.info(f"🚀 GOD MODE ACTIVATED - Priority Mode: {priority_mode.upper()}")
         logger.info(f"   Staff Strictness: {staff_strictness}")
         logger.info(f"   Constraints Strictness: {constraints_strictness.upper()}")
         
-        filtered_course_list = []
-        
-        # Filter sections based on priority mode
-        if priority_mode == 'staff':
-            logger.info("   FILTER ORDER: STAFF → TIME CONSTRAINTS")
-            for course in self.course_list:
-                temp_sections = self._filter_sections_staff_first(
-                    course, staff_preferences, staff_strictness,
-                    allow_saturday, allow_morning_mode, allow_evening_mode,
-                    constraints_strictness
-                )
-                if not temp_sections:
-                    return [], [], [], self.stats
-                filtered_course_list.append(temp_sections)
-        else:
-            logger.info("   FILTER ORDER: TIME CONSTRAINTS → STAFF")
-            for course in self.course_list:
-                temp_sections = self._filter_sections_constraints_first(
-                    course, staff_preferences, staff_strictness,
-                    allow_saturday, allow_morning_mode, allow_evening_mode,
-                    constraints_strictness
-                )
-                if not temp_sections:
-                    return [], [], [], self.stats
-                filtered_course_list.append(temp_sections)
+        filtered_course_list = self._filter_courses(
+            staff_preferences, priority_mode, staff_strictness,
+            allow_saturday, allow_morning_mode, allow_evening_mode,
+            constraints_strictness
+        )
+        if filtered_course_list is None:
+            return [], [], [], self.stats
         
         self.course_list = filtered_course_list
         
@@ -958,8 +2315,19 @@ class GodModeTimetableFinder:
         self.stats['total_combinations'] = total_combinations
         logger.info(f"   Total combinations after filtering: {total_combinations:,}")
         
+        if self.resume_from is not None:
+            logger.info(f"   Resuming after {self.resume_from.combinations_tried:,} combinations")
+        
         # Choose search strategy
-        if total_combinations <= 1_000_000:
+        if sample:
+            self.stats['search_strategy'] = 'sampling'
+            logger.info("   Strategy: UNIFORM RANDOM SAMPLING")
+            timetables = self._find_all_sampled(
+                sample_seed, max_per_day, need_free_day, free_day_pref,
+                allow_morning_mode, allow_evening_mode, allow_saturday,
+                constraints_strictness
+            )
+        elif total_combinations <= 1_000_000:
             self.stats['search_strategy'] = 'bitmask'
             logger.info("   Strategy: BITMASK BRUTE FORCE")
             timetables = self._find_all_bitmask(
@@ -976,9 +2344,14 @@ class GodModeTimetableFinder:
                 constraints_strictness
             )
         
+        if self.checkpoint is not None:
+            self.checkpoint.found = len(self.all_timetables) + (self.resume_from.found if self.resume_from else 0)
+            self.checkpoint.time_elapsed = self.stats['time_elapsed']
+        self.stats['checkpoint'] = self.checkpoint
+        
         # Apply strict staff filtering if needed
         if staff_strictness == 'strict' and staff_preferences:
-            timetables = self._apply_strict_staff_filtering(timetables, staff_preferences)
+            timetables = self._apply_strict_staff_filtering(timetables, self.staff_ranks)
         
         # Update final stats
         with self._lock:
@@ -1006,6 +2379,39 @@ class GodModeTimetableFinder:
         
         return self.all_timetables, self.staff_warnings, self.staff_deviations, self.stats
 
+    def _filter_courses(self, staff_preferences, priority_mode, staff_strictness,
+                        allow_saturday, allow_morning_mode, allow_evening_mode,
+                        constraints_strictness) -> Optional[List[Course]]:
+        """Each course with only the sections this search may use, or None
+        to stop the search."""
+        filtered_course_list = []
+        
+        # Filter sections based on priority mode
+        if priority_mode == 'staff':
+            logger.info("   FILTER ORDER: STAFF → TIME CONSTRAINTS")
+            for course in self.course_list:
+                temp_sections = self._filter_sections_staff_first(
+                    course, staff_preferences, staff_strictness,
+                    allow_saturday, allow_morning_mode, allow_evening_mode,
+                    constraints_strictness
+                )
+                if not temp_sections:
+                    return None
+                filtered_course_list.append(temp_sections)
+        else:
+            logger.info("   FILTER ORDER: TIME CONSTRAINTS → STAFF")
+            for course in self.course_list:
+                temp_sections = self._filter_sections_constraints_first(
+                    course, staff_preferences, staff_strictness,
+                    allow_saturday, allow_morning_mode, allow_evening_mode,
+                    constraints_strictness
+                )
+                if not temp_sections:
+                    return None
+                filtered_course_list.append(temp_sections)
+        
+        return filtered_course_list
+
     def _filter_sections_staff_first(self, course, staff_preferences, staff_strictness,
                                 allow_saturday, allow_morning_mode, allow_evening_mode,
                                 constraints_strictness):
@@ -1013,11 +2419,12 @@ class GodModeTimetableFinder:
         
         if staff_preferences and course.code in staff_preferences:
             allowed_staff = staff_preferences[course.code]
+            allowed_ids = self.staff_ranks[course.code]
             
             if staff_strictness == 'strict':
                 staff_filtered = [
                     sec for sec in temp_sections 
-                    if sec.get_normalized_staff_name() in allowed_staff
+                    if sec.staff_id in allowed_ids
                 ]
                 
                 if staff_filtered:
@@ -1032,7 +2439,7 @@ class GodModeTimetableFinder:
                         'message': f"Course {course.code}: No sections with preferred staff available (falling back to all)."
                     })
             else:
-                preferred_count = sum(1 for sec in temp_sections if sec.get_normalized_staff_name() in allowed_staff)
+                preferred_count = sum(1 for sec in temp_sections if sec.staff_id in allowed_ids)
                 leftover_count = len(temp_sections) - preferred_count
                 
                 if leftover_count > 0:
@@ -1068,7 +2475,7 @@ class GodModeTimetableFinder:
         if not temp_sections:
             logger.error(f"   Course {course.code}: No sections after staff-first filtering")
         
-        return Course(course.code, course.name, course.credits, temp_sections)
+        return Course(course.code, course.name, course.credits, temp_sections, course.course_type)
 
     def _filter_sections_constraints_first(self, course, staff_preferences, staff_strictness,
                                         allow_saturday, allow_morning_mode, allow_evening_mode,
@@ -1093,11 +2500,12 @@ class GodModeTimetableFinder:
         
         if staff_preferences and course.code in staff_preferences:
             allowed_staff = staff_preferences[course.code]
+            allowed_ids = self.staff_ranks[course.code]
             
             if staff_strictness == 'strict':
                 staff_filtered = [
                     sec for sec in temp_sections 
-                    if sec.get_normalized_staff_name() in allowed_staff
+                    if sec.staff_id in allowed_ids
                 ]
                 
                 if staff_filtered:
@@ -1112,7 +2520,7 @@ class GodModeTimetableFinder:
                         'message': f"Course {course.code}: No time-compatible sections with preferred staff (falling back to all)."
                     })
             else:
-                preferred_count = sum(1 for sec in temp_sections if sec.get_normalized_staff_name() in allowed_staff)
+                preferred_count = sum(1 for sec in temp_sections if sec.staff_id in allowed_ids)
                 leftover_count = len(temp_sections) - preferred_count
                 
                 if leftover_count > 0:
@@ -1132,15 +2540,15 @@ class GodModeTimetableFinder:
         if not temp_sections:
             logger.error(f"   Course {course.code}: No sections after constraints-first filtering")
         
-        return Course(course.code, course.name, course.credits, temp_sections)
+        return Course(course.code, course.name, course.credits, temp_sections, course.course_type)
 
-    def _apply_strict_staff_filtering(self, timetables, staff_preferences):
+    def _apply_strict_staff_filtering(self, timetables, staff_ranks):
         strict_timetables = []
         for timetable in self.all_timetables:
             all_preferred = True
             for section in timetable.sections:
-                if section.subject_code in staff_preferences:
-                    if section.get_normalized_staff_name() not in staff_preferences[section.subject_code]:
+                if section.subject_code in staff_ranks:
+                    if section.staff_id not in staff_ranks[section.subject_code]:
                         all_preferred = False
                         break
             
@@ -1155,6 +2563,16 @@ class GodModeTimetableFinder:
         logger.info(f"   After strict staff filtering: {len(strict_timetables)} timetables")
         return strict_timetables
 
+    def _resume_cursors(self, strategy: str, sizes: List[int]) -> Optional[List[int]]:
+        """Cursors to start from, if resuming; the checkpoint must be from this search."""
+        checkpoint = self.resume_from
+        if checkpoint is None:
+            return None
+        if checkpoint.strategy != strategy or checkpoint.sizes != sizes:
+            raise ValueError("Checkpoint does not match this search")
+        self.stats['combinations_tried'] = checkpoint.combinations_tried
+        return checkpoint.cursors
+
     def _find_all_bitmask(self, max_per_day, need_free_day, free_day_pref,
                         allow_morning_mode, allow_evening_mode, allow_saturday,
                         constraints_strictness):
@@ -1163,7 +2581,6 @@ class GodModeTimetableFinder:
         total_combinations = self.stats['total_combinations']
         logger.info(f"BITMASK MODE: {total_combinations:,} combinations")
 
-        checked = 0
         self.stats['combinations_tried'] = 0
 
         original_indices = list(range(len(self.course_list)))
@@ -1172,18 +2589,40 @@ class GodModeTimetableFinder:
         # Sort by number of sections for better pruning
         sorted_indices = sorted(range(len(section_lists)), key=lambda i: len(section_lists[i]))
         sorted_section_lists = [section_lists[i] for i in sorted_indices]
+        sizes = [len(sections) for sections in sorted_section_lists]
         
         update_interval = min(1000, max(1, total_combinations // 10)) if total_combinations > 0 else 1
         
-        for combination in itertools.product(*sorted_section_lists):
-            checked += 1
-            self.stats['combinations_tried'] = checked
-            
+        # Combinations are visited in product order, so a position is a mixed-radix number
+        combinations = itertools.product(*sorted_section_lists)
+        position = 0
+        cursors = self._resume_cursors('bitmask', sizes)
+        if cursors is not None:
+            for digit, size in zip(cursors, sizes):
+                position = position * size + digit
+            combinations = itertools.islice(combinations, position, None)
+        checked = self.stats['combinations_tried']
+        
+        def save_checkpoint():
+            if position >= total_combinations:
+                return
+            digits, rest = [], position
+            for size in reversed(sizes):
+                rest, digit = divmod(rest, size)
+                digits.append(digit)
+            self.checkpoint = SearchCheckpoint('bitmask', digits[::-1], 0, sizes, position, 0)
+        
+        for combination in combinations:
             # Check timeout
             if time.time() - start_time > self.timeout:
                 logger.warning(f"Bitmask search timeout reached ({self.timeout} seconds)")
                 self.stats['timeout_triggered'] = True
+                save_checkpoint()
                 break
+            # Counted with the position, so a resume does not count it twice
+            position += 1
+            checked += 1
+            self.stats['combinations_tried'] = checked
 
             # Restore original order
             original_order = [None] * len(combination)
@@ -1220,17 +2659,130 @@ class GodModeTimetableFinder:
                 
                 if len(self.all_timetables) >= self.max_results:
                     logger.warning(f"Reached max results limit: {self.max_results}")
+                    save_checkpoint()
                     break
 
             if checked % update_interval == 0:
                 logger.info(f"Bitmask checked {checked:,} combos, found {len(self.all_timetables):,} valid")
 
+        elapsed = time.time() - start_time
+        if self.resume_from is not None:
+            elapsed += self.resume_from.time_elapsed
+        self.stats.update({
+            'time_elapsed': elapsed
+        })
+        return self.all_timetables
+
+    def _find_all_sampled(self, seed, max_per_day, need_free_day, free_day_pref,
+                        allow_morning_mode, allow_evening_mode, allow_saturday,
+                        constraints_strictness):
+        """Valid timetables drawn uniformly at random, without repeats.
+
+        If the conflict-free combinations can be counted (see ResultSpace),
+        they are drawn by position; otherwise one random section is drawn
+        per course and conflicting draws are rejected, for at most
+        SAMPLE_MAX_ATTEMPTS draws. Either way, draws failing strict
+        constraints on whole timetables are rejected too.
+        """
+        start_time = time.time()
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        rng = random.Random(seed)
+        self.stats['sample_seed'] = seed
+        self.stats['combinations_tried'] = 0
+        
+        constraints = {
+            'max_per_day': max_per_day,
+            'need_free_day': need_free_day,
+            'free_day_pref': free_day_pref,
+            'allow_morning_mode': allow_morning_mode,
+            'allow_evening_mode': allow_evening_mode,
+            'allow_saturday': allow_saturday,
+            'constraints_strictness': constraints_strictness
+        }
+        domains = [sorted(course.sections, key=lambda s: len(s.time_slots)) for course in self.course_list]
+        if need_free_day and free_day_pref and constraints_strictness == 'strict':
+            # No valid timetable uses a section on the required free day
+            domains = [[s for s in sections if free_day_pref not in s.get_occupied_days()] for sections in domains]
+        masks = [[section.time_bitmask for section in sections] for sections in domains]
+        # Counted with the courses with fewest sections first, which needs far
+        # fewer counting states; selections are put back in course order
+        by_size = sorted(range(len(domains)), key=lambda i: len(domains[i]))
+        space = None
+        if all(domains):
+            try:
+                space = ResultSpace([domains[i] for i in by_size], SAMPLE_SPACE_STATES)
+            except ValueError as e:
+                logger.info(f"   Sampling by rejection: {e}")
+        self.stats['sampled_from'] = space.total if space is not None else None
+        
+        def unrank(k: int) -> List[CourseSection]:
+            selection = [None] * len(domains)
+            for i, section in zip(by_size, space.unrank(k)):
+                selection[i] = section
+            return selection
+        
+        # Positions (or section choices) drawn so far; a small space is
+        # instead visited in one random order
+        seen: Set[Any] = set()
+        order = None
+        if space is not None and space.total <= 4 * self.max_results:
+            order = list(range(space.total))
+            rng.shuffle(order)
+            order = iter(order)
+        
+        while all(domains) and len(self.all_timetables) < self.max_results:
+            if time.time() - start_time > self.timeout:
+                self.stats['timeout_triggered'] = True
+                break
+            if space is None and self.stats['combinations_tried'] >= SAMPLE_MAX_ATTEMPTS:
+                logger.info(f"   Sampling stopped after {SAMPLE_MAX_ATTEMPTS:,} draws")
+                break
+            self.stats['combinations_tried'] += 1
+            
+            if space is None:
+                positions = self._draw_positions(masks, rng)
+                if positions is None or positions in seen:
+                    continue
+                seen.add(positions)
+                selection = [sections[p] for sections, p in zip(domains, positions)]
+            elif order is not None:
+                k = next(order, None)
+                if k is None:
+                    break
+                selection = unrank(k)
+            else:
+                if len(seen) == space.total:
+                    break
+                k = rng.randrange(space.total)
+                if k in seen:
+                    continue
+                seen.add(k)
+                selection = unrank(k)
+            
+            is_valid, violations = self._check_constraints(selection, **constraints)
+            if is_valid or constraints_strictness == 'flexible':
+                self._add_timetable(selection, violations)
+        
         elapsed = time.time() - start_time
         self.stats.update({
             'time_elapsed': elapsed
         })
         return self.all_timetables
 
+    @staticmethod
+    def _draw_positions(masks: List[List[int]], rng: random.Random) -> Optional[Tuple[int, ...]]:
+        """A random section position per course, or None if they conflict."""
+        positions = []
+        occupied_bitmask = 0
+        for section_masks in masks:
+            position = rng.randrange(len(section_masks))
+            if occupied_bitmask & section_masks[position]:
+                return None
+            occupied_bitmask |= section_masks[position]
+            positions.append(position)
+        return tuple(positions)
+
     def _find_all_recursive(self, max_per_day, need_free_day, free_day_pref,
                         allow_morning_mode, allow_evening_mode, allow_saturday,
                         constraints_strictness):
@@ -1248,29 +2800,39 @@ class GodModeTimetableFinder:
         }
         
         self.stats['combinations_tried'] = 0
+        self._sizes = [len(course.sections) for course in self.course_list]
+        # Position of the section chosen at each depth of the current path
+        self._path = [0] * len(self.course_list)
+        resume = self._resume_cursors('recursive_pruned', self._sizes)
         
         # Start recursive search
-        self._recursive_search(0, [], 0, constraints)
+        self._recursive_search(0, [], 0, constraints, resume)
         
         elapsed = time.time() - start_time
+        if self.resume_from is not None:
+            elapsed += self.resume_from.time_elapsed
         self.stats.update({
             'time_elapsed': elapsed
         })
         return self.all_timetables
 
     def _recursive_search(self, course_idx: int, current_selection: List[CourseSection], 
-                        current_bitmask: int, kwargs: Dict[str, Any]) -> bool:
+                        current_bitmask: int, kwargs: Dict[str, Any],
+                        resume: Optional[List[int]] = None) -> bool:
         """
         Recursive search with early termination.
-        Returns True if search should stop.
+        Returns True if search should stop; this node is then the checkpoint.
+        `resume` is the rest of a checkpoint's path below this node.
         """
         # Check timeout
         if time.time() - self.search_start_time > self.timeout:
             self.stats['timeout_triggered'] = True
+            self._stop_at(course_idx, current_bitmask)
             return True
             
         # Check if we have enough results
         if len(self.all_timetables) >= self.max_results:
+            self._stop_at(course_idx, current_bitmask)
             return True
         
         # Base case: all courses processed
@@ -1298,22 +2860,32 @@ class GodModeTimetableFinder:
         # Sort sections by time slots count for better pruning
         allowed_sections = sorted(course.sections, key=lambda s: len(s.time_slots))
         
-        for section in allowed_sections:
+        start = resume[0] if resume else 0
+        for position in range(start, len(allowed_sections)):
+            section = allowed_sections[position]
             # Check for time conflicts using bitmask (fast)
             if current_bitmask & section.time_bitmask:
                 continue
             
             # Try this section
+            self._path[course_idx] = position
             if self._recursive_search(
                 course_idx + 1, 
                 current_selection + [section], 
                 current_bitmask | section.time_bitmask,
-                kwargs
+                kwargs,
+                resume[1:] if resume and position == start else None
             ):
                 return True  # Early termination requested
         
         return False
 
+    def _stop_at(self, course_idx: int, current_bitmask: int):
+        self.checkpoint = SearchCheckpoint(
+            'recursive_pruned', self._path[:course_idx], current_bitmask, self._sizes,
+            self.stats['combinations_tried'], 0
+        )
+
     def _check_constraints(self, selection: List[CourseSection], 
                         constraints_strictness: str = 'strict',
                         **kwargs) -> Tuple[bool, List[ConstraintViolation]]:
@@ -1399,47 +2971,330 @@ class GodModeTimetableFinder:
         else:
             return True, violations
 
-# ========== WORKER FUNCTION ==========
-def run_search_worker(courses_data: Dict[str, Any], selected_codes: List[str], 
-                    max_results: int, timeout: int, kwargs: Dict[str, Any]):
-    """Worker function for process pool execution."""
-    # Reconstruct courses from serialized data
-    courses = {}
-    for code, course_data in courses_data.items():
-        sections = []
-        for sec_data in course_data['sections']:
-            time_slots = []
-            for ts_data in sec_data['time_slots']:
-                time_slots.append(TimeSlot(**ts_data))
-            
-            sections.append(CourseSection(
-                subject_code=sec_data['subject_code'],
+# ========== RESULT SPACE ==========
+class ResultSpace:
+    """Every conflict-free choice of one section per domain, counted
+    rather than enumerated.
+
+    Completions are counted once per (depth, occupied slots), keeping only
+    the slots later domains can still collide with, so the k-th combination
+    in search order is found by descending one domain at a time.
+    """
+    def __init__(self, domains: List[List[CourseSection]], max_states: int = RESULT_SPACE_STATES):
+        self.domains = domains
+        self.max_states = max_states
+        self._masks = [[section.time_bitmask for section in sections] for sections in domains]
+        # Distinct masks of each domain, with how many sections share them
+        self._groups: List[List[Tuple[int, int]]] = []
+        for masks in self._masks:
+            groups: Dict[int, int] = {}
+            for mask in masks:
+                groups[mask] = groups.get(mask, 0) + 1
+            self._groups.append(list(groups.items()))
+        # Slots used by any section at this depth or later
+        self._later_bits = [0] * (len(domains) + 1)
+        for depth in range(len(domains) - 1, -1, -1):
+            bits = self._later_bits[depth + 1]
+            for mask in self._masks[depth]:
+                bits |= mask
+            self._later_bits[depth] = bits
+        self._counts: Dict[Tuple[int, int], int] = {}
+        self.total = self.count(0, 0)
+    
+    def count(self, depth: int, mask: int) -> int:
+        """Conflict-free completions of domains `depth`.. around occupied `mask`."""
+        if depth == len(self.domains):
+            return 1
+        mask &= self._later_bits[depth]
+        key = (depth, mask)
+        total = self._counts.get(key)
+        if total is None:
+            if len(self._counts) >= self.max_states:
+                raise ValueError(f"Result space needs more than {self.max_states:,} counting states")
+            total = 0
+            for section_mask, multiplicity in self._groups[depth]:
+                if not mask & section_mask:
+                    total += multiplicity * self.count(depth + 1, mask | section_mask)
+            self._counts[key] = total
+        return total
+    
+    def unrank(self, k: int) -> List[CourseSection]:
+        """The k-th (from 0) combination in search order."""
+        if not 0 <= k < self.total:
+            raise IndexError(f"Result {k} out of range ({self.total} results)")
+        selection = []
+        mask = 0
+        for depth, sections in enumerate(self.domains):
+            for section, section_mask in zip(sections, self._masks[depth]):
+                if mask & section_mask:
+                    continue
+                completions = self.count(depth + 1, mask | section_mask)
+                if k < completions:
+                    selection.append(section)
+                    mask |= section_mask
+                    break
+                k -= completions
+        return selection
+    
+    def restricted(self, keep: Callable[[int, CourseSection], bool]) -> "ResultSpace":
+        """The same space with only the sections `keep(depth, section)` allows."""
+        return ResultSpace(
+            [[s for s in sections if keep(depth, s)] for depth, sections in enumerate(self.domains)],
+            self.max_states
+        )
+
+class ResultSpaceView:
+    """A ResultSpace as a read-only sequence of TimetableWithViolations,
+    each built when it is looked up."""
+    def __init__(self, space: ResultSpace, finder: "GodModeTimetableFinder", constraints: Dict[str, Any]):
+        self.space = space
+        self.finder = finder
+        self.constraints = constraints
+    
+    def __len__(self) -> int:
+        return self.space.total
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        sections = self.space.unrank(index)
+        _, violations = self.finder._check_constraints(sections, **self.constraints)
+        return TimetableWithViolations(sections=sections, violations=violations)
+
+# Flexible constraints that a single section can violate: type -> test
+SECTION_VIOLATIONS = {
+    'no_saturday': CourseSection.has_saturday_classes,
+    'no_morning': CourseSection.has_morning_classes,
+    'no_evening': CourseSection.has_evening_classes,
+}
+
+def summarize_result_space(space: ResultSpace, search_kwargs: Dict[str, Any],
+                           staff_ranks: Dict[str, Dict[int, int]]) -> Tuple["ResultSummary", Dict[str, int]]:
+    """summarize_results() and violations by type for a whole space,
+    counting restricted spaces instead of visiting timetables."""
+    active = []
+    if search_kwargs['constraints_strictness'] == 'flexible':
+        if not search_kwargs['allow_saturday']:
+            active.append('no_saturday')
+        if search_kwargs['allow_morning_mode'] == 'no':
+            active.append('no_morning')
+        if search_kwargs['allow_evening_mode'] == 'no':
+            active.append('no_evening')
+    
+    violations_by_type = {}
+    for violation_type in active:
+        violates = SECTION_VIOLATIONS[violation_type]
+        count = space.total - space.restricted(lambda depth, s: not violates(s)).total
+        if count:
+            violations_by_type[violation_type] = count
+    clean = space.restricted(lambda depth, s: not any(SECTION_VIOLATIONS[t](s) for t in active))
+    
+    def preferred(section: CourseSection) -> bool:
+        ranks = staff_ranks.get(section.subject_code)
+        return ranks is None or section.staff_id in ranks
+    
+    warnings_aggregator = StaffWarningsAggregator()
+    warnings_aggregator.total_timetables = space.total
+    if staff_ranks:
+        all_preferred = space.restricted(lambda depth, s: preferred(s))
+        warnings_aggregator.timetable_count_with_non_preferred = space.total - all_preferred.total
+        for depth, sections in enumerate(space.domains):
+            if sections and sections[0].subject_code in staff_ranks:
+                non_preferred = space.restricted(lambda d, s: d != depth or not preferred(s))
+                if non_preferred.total:
+                    warnings_aggregator.subjects_with_non_preferred.add(sections[0].subject_code)
+    
+    summary = ResultSummary(
+        space.total, sum(violations_by_type.values()), space.total - clean.total, warnings_aggregator
+    )
+    return summary, violations_by_type
+
+def build_result_space(catalog: CatalogSnapshot, selected_codes: List[str], whole_catalog: bool,
+                       search_kwargs: Dict[str, Any]) -> Optional[CachedResult]:
+    """Every timetable of a search, in the order the recursive search visits
+    them, without running it: timetables are built per page from counts.
+
+    None if the search has constraints on whole timetables (max per day,
+    free day) or needs more than RESULT_SPACE_STATES counting states.
+    """
+    if search_kwargs['max_per_day'] or search_kwargs['need_free_day']:
+        return None
+    started = time.time()
+    staff_preferences = search_kwargs['staff_preferences']
+    finder = GodModeTimetableFinder(catalog.courses, selected_codes)
+    finder.staff_ranks = compile_staff_preferences(staff_preferences)
+    filtered = finder._filter_courses(
+        staff_preferences, search_kwargs['priority_mode'], search_kwargs['staff_strictness'],
+        search_kwargs['allow_saturday'], search_kwargs['allow_morning_mode'],
+        search_kwargs['allow_evening_mode'], search_kwargs['constraints_strictness']
+    )
+    if filtered is None:
+        return None
+    # Same section order as _recursive_search
+    domains = [sorted(course.sections, key=lambda s: len(s.time_slots)) for course in filtered]
+    try:
+        space = ResultSpace(domains)
+        if space.total > sys.maxsize:
+            raise ValueError(f"Result space too large to index ({space.total:.3g} timetables)")
+        summary, violations_by_type = summarize_result_space(space, search_kwargs, finder.staff_ranks)
+    except ValueError as e:
+        logger.info(f"Result space not indexed: {e}")
+        return None
+    
+    total_combinations = 1
+    for sections in domains:
+        total_combinations *= len(sections)
+    stats = dict(
+        finder.stats,
+        total_combinations=total_combinations,
+        valid_timetables=space.total,
+        time_elapsed=time.time() - started,
+        constraint_strictness=search_kwargs['constraints_strictness'],
+        total_violations=summary.violations_count,
+        violations_by_type=violations_by_type,
+        coverage_percentage=100.0,
+        search_complete=True,
+        max_results=space.total,
+        search_strategy='counting',
+        order='index',
+        resumable=False,
+        catalog_version=catalog.version,
+    )
+    constraints = {
+        key: search_kwargs[key] for key in (
+            'max_per_day', 'need_free_day', 'free_day_pref', 'allow_morning_mode',
+            'allow_evening_mode', 'allow_saturday', 'constraints_strictness'
+        )
+    }
+    logger.info(
+        f"Result space: {space.total:,} timetables over {len(domains)} courses, "
+        f"{len(space._counts):,} counting states, {stats['time_elapsed']:.2f}s"
+    )
+    return CachedResult(
+        timetables=ResultSpaceView(space, finder, constraints),
+        staff_warnings=finder.staff_warnings,
+        staff_deviations=finder.staff_deviations,
+        stats=stats,
+        depends_on=set(selected_codes),
+        whole_catalog=whole_catalog,
+        catalog_version=catalog.version,
+        catalog_id=catalog.catalog_id,
+        summary=summary,
+        render_cache=RenderCache()
+    )
+
+# ========== WORKER FUNCTION ==========
+class ResultBatcher:
+    """Forwards timetables found by a worker search to the server.
+
+    The first `preview` timetables go out as batches, each a list of
+    ([(course code, section index), ...], [(violation type, description,
+    priority), ...]). Batches start at one timetable and double, so the
+    first result is sent at once. After that only the number found so far
+    (an int) is sent; None ends the stream.
+    """
+    def __init__(self, queue, preview: int = STREAM_PREVIEW_RESULTS, max_delay: float = STREAM_BATCH_SECONDS):
+        self.queue = queue
+        self.preview = preview
+        self.max_delay = max_delay
+        self._pending = []
+        self._found = 0
+        self._batch_size = 1
+        self._last_flush = time.monotonic()
+    
+    def add(self, timetable: TimetableWithViolations):
+        self._found += 1
+        if self._found <= self.preview:
+            self._pending.append((
+                [(s.subject_code, s.index) for s in timetable.sections],
+                [(v.type, v.description, v.priority) for v in timetable.violations]
+            ))
+            if len(self._pending) >= self._batch_size or self._found == self.preview:
+                self.flush()
+        if time.monotonic() - self._last_flush >= self.max_delay:
+            self.flush()
+    
+    def flush(self):
+        if self._pending:
+            self.queue.put(self._pending)
+            self._pending = []
+            self._batch_size *= 2
+        elif self._found > self.preview:
+            self.queue.put(self._found)
+        self._last_flush = time.monotonic()
+    
+    def close(self):
+        self.flush()
+        self.queue.put(None)
+
+def run_search_worker(courses_data: Dict[str, Any], selected_codes: List[str], 
+                    max_results: int, timeout: int, kwargs: Dict[str, Any],
+                    staff_names: List[str] = None, progress=None,
+                    checkpoint: Optional[SearchCheckpoint] = None):
+    """Worker function for process pool execution.
+
+    With a `progress` queue, timetables are also sent there as they are
+    found (see ResultBatcher). With a `checkpoint`, the search continues
+    from there and returns only the timetables found after it; stats
+    carry the next checkpoint, if it stopped early again.
+    """
+    # Use the server's staff ids so results map back to the same names
+    if staff_names is not None:
+        staff_table.sync(staff_names)
+    
+    # Reconstruct courses from serialized data
+    courses = {}
+    for code, course_data in courses_data.items():
+        sections = []
+        for sec_data in course_data['sections']:
+            time_slots = []
+            for ts_data in sec_data['time_slots']:
+                time_slots.append(TimeSlot(**ts_data))
+            
+            sections.append(CourseSection(
+                subject_code=sec_data['subject_code'],
                 section_code=sec_data['section_code'],
                 faculty=sec_data['faculty'],
                 dept=sec_data['dept'],
-                time_slots=time_slots
+                time_slots=time_slots,
+                staff_id=sec_data.get('staff_id', -1),
+                index=sec_data.get('index', -1)
             ))
         
         courses[code] = Course(
             code=course_data['code'],
             name=course_data['name'],
             credits=course_data['credits'],
-            sections=sections
+            sections=sections,
+            course_type=course_data.get('type', '')
         )
     
     finder = GodModeTimetableFinder(courses, selected_codes, max_results, timeout)
-    result = finder.find_all_timetables(**kwargs)
-    return result  # Returns (timetables, warnings, deviations, stats)
+    finder.resume_from = checkpoint
+    if progress is None:
+        result = finder.find_all_timetables(**kwargs)
+        return result  # Returns (timetables, warnings, deviations, stats)
+    
+    batcher = ResultBatcher(progress)
+    finder.result_listener = batcher.add
+    try:
+        return finder.find_all_timetables(**kwargs)
+    finally:
+        batcher.close()
 
 # ========== ASYNC WRAPPER ==========
 async def run_god_search_async(courses_data: Dict[str, Any], selected_codes: List[str],
-                            max_results: int, timeout: int, **kwargs):
+                            max_results: int, timeout: int, progress=None,
+                            checkpoint: Optional[SearchCheckpoint] = None, **kwargs):
     """Run search in a separate process."""
     try:
         loop = asyncio.get_running_loop()
         result = await loop.run_in_executor(
             get_process_pool(),
-            partial(run_search_worker, courses_data, selected_codes, max_results, timeout, kwargs)
+            partial(run_search_worker, courses_data, selected_codes, max_results, timeout, kwargs,
+                    list(staff_table.names), progress, checkpoint)
         )
         return result
     except Exception as e:
@@ -1480,20 +3335,7 @@ def render_constraint_violations_html(violations):
     else:
         msg = f"Your {', '.join(parts[:-1])}, and {parts[-1]} requirements were violated."
 
-    return f"""
-    <div style="
-        padding:12px;
-        margin-bottom:15px;
-        background:rgba(239,68,68,0.1);
-        border:1px solid rgba(239,68,68,0.4);
-        border-radius:8px;
-        text-align:center;
-        font-weight:600;
-        color:#fecaca;
-    ">
-        {msg}
-    </div>
-    """
+    return f'<div class="violation-msg">{msg}</div>'
 
 class StaffWarningsAggregator:
     """Efficiently aggregates staff warnings across timetables."""
@@ -1502,16 +3344,15 @@ class StaffWarningsAggregator:
         self.timetable_count_with_non_preferred = 0
         self.total_timetables = 0
     
-    def add_timetable(self, timetable, staff_preferences):
-        """Add a timetable for analysis."""
+    def add_timetable(self, timetable, staff_ranks):
+        """Add a timetable for analysis (`staff_ranks` from compile_staff_preferences)."""
         self.total_timetables += 1
         has_non_preferred = False
         
         for section in timetable.sections:
             subject_code = section.subject_code
-            if subject_code in staff_preferences:
-                section_staff = section.get_normalized_staff_name()
-                if section_staff not in staff_preferences[subject_code]:
+            if subject_code in staff_ranks:
+                if section.staff_id not in staff_ranks[subject_code]:
                     self.subjects_with_non_preferred.add(subject_code)
                     has_non_preferred = True
         
@@ -1525,223 +3366,215 @@ class StaffWarningsAggregator:
         
         total_subjects = len(self.subjects_with_non_preferred)
         
-        return f"""
-        <div style="
-            padding:15px;
-            margin-bottom:20px;
-            background:rgba(245,158,11,0.1);
-            border:1px solid rgba(245,158,11,0.4);
-            border-radius:8px;
-        ">
-            <div style="display:flex; align-items:center; gap:10px; margin-bottom:10px;">
-                <div style="
-                    width:30px;
-                    height:30px;
-                    background:#f59e0b;
-                    color:white;
-                    border-radius:50%;
-                    display:flex;
-                    align-items:center;
-                    justify-content:center;
-                    font-weight:bold;
-                ">!</div>
-                <strong style="color:#f59e0b;">Staff Preference Warning</strong>
-            </div>
-            <p style="color:#f59e0b; margin:0;">
-                {self.timetable_count_with_non_preferred} of {self.total_timetables} timetables use non-preferred staff 
-                for {total_subjects} subject(s). In strict mode, these timetables would be excluded.
-            </p>
-        </div>
-        """
+        return (
+            '<div class="staff-warning">'
+            '<div class="staff-warning-head"><div class="warning-icon">!</div>'
+            '<strong>Staff Preference Warning</strong></div>'
+            f'<p>{self.timetable_count_with_non_preferred} of {self.total_timetables} '
+            f'timetables use non-preferred staff for {total_subjects} subject(s). '
+            'In strict mode, these timetables would be excluded.</p>'
+            '</div>'
+        )
+
+@dataclass
+class ResultSummary:
+    """Aggregates over a whole result set, computed once when it is produced.
+
+    Pages are rendered from this instead of rescanning every timetable.
+    """
+    total: int
+    violations_count: int
+    timetables_with_violations: int
+    staff_warnings: StaffWarningsAggregator
+
+def summarize_results(timetables: List[TimetableWithViolations],
+                      staff_preferences: Dict[str, List[str]] = None) -> ResultSummary:
+    staff_ranks = compile_staff_preferences(staff_preferences)
+    warnings_aggregator = StaffWarningsAggregator()
+    violations_count = with_violations = 0
+    for timetable in timetables:
+        warnings_aggregator.add_timetable(timetable, staff_ranks)
+        if timetable.violations:
+            violations_count += len(timetable.violations)
+            with_violations += 1
+    return ResultSummary(len(timetables), violations_count, with_violations, warnings_aggregator)
+
+# Max rendered timetables kept per result set
+RENDER_CACHE_TIMETABLES = 200
+
+@dataclass
+class RenderCache:
+    """HTML fragments for one result set, reused across page views.
+
+    Lives with the result set (which keeps its sections alive, so their
+    ids are stable keys); both maps assume the same courses, staff
+    preferences and strictness for every render.
+    """
+    # (id(section), staff status) -> section details block
+    sections: Dict[Tuple[int, str], str] = field(default_factory=dict)
+    # Display index -> whole timetable
+    timetables: "OrderedDict[int, str]" = field(default_factory=OrderedDict)
+    # Pages of one result set may render on several threads at once
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+# Markup below is styled by the result classes in front.html's stylesheet
+_GRID_HEADER_HTML = (
+    '<table class="result-grid"><thead><tr><th>Day</th>'
+    + ''.join(f'<th>{start}-{end}</th>' for start, end in HOUR_SLOTS)
+    + '</tr></thead><tbody>'
+)
+_GRID_DAY_CELLS = [f'<th>{day}</th>' for day in DAYS_ORDER]
+_NON_PREFERRED_BADGE = '<span class="np-badge">Non-Preferred</span>'
+# Badge class by the highest-priority (lowest number) violation
+_VIOLATION_BADGE_CLASSES = ((2, "high"), (3, "medium"))
+
+def render_section_details_html(section: CourseSection, course_name: str, staff_status: str) -> str:
+    """The "Section Details" block for one section."""
+    schedule_summary = defaultdict(list)
+    for slot in section.time_slots:
+        schedule_summary[slot.day].append(
+            f"{minutes_to_time(slot.start_min)}-{minutes_to_time(slot.end_min)}"
+        )
+    schedule_html = [
+        f"{day}: {', '.join(schedule_summary[day])}"
+        for day in DAYS_ORDER if day in schedule_summary
+    ]
+    
+    faculty = section.faculty or "N/A"
+    staff_badge = ""
+    if staff_status == "non_preferred":
+        faculty_display = f'<span class="np">{html.escape(faculty)} ⚠</span>'
+        staff_badge = _NON_PREFERRED_BADGE
+    else:
+        faculty_display = html.escape(faculty)
+    
+    subject_display = f"{html.escape(course_name)} - {html.escape(section.subject_code)} - {html.escape(section.section_code)}" if course_name else f"{html.escape(section.subject_code)} - {html.escape(section.section_code)}"
+    
+    return (
+        f'<div class="section-card"><div class="section-title">{subject_display} {staff_badge}</div>'
+        f'<div>Faculty: {faculty_display}</div>'
+        f'<div>Schedule: {" | ".join(schedule_html)}</div></div>'
+    )
 
 def render_single_timetable_html(
     timetable: TimetableWithViolations, 
     idx: int, 
     courses: Dict[str, Course] = None,
     staff_preferences: Dict[str, List[str]] = None, 
-    staff_strictness: str = "strict"
+    staff_strictness: str = "strict",
+    staff_ranks: Dict[str, Dict[int, int]] = None,
+    render_cache: RenderCache = None
 ) -> str:
+    if render_cache is not None:
+        with render_cache.lock:
+            cached = render_cache.timetables.get(idx)
+            if cached is not None:
+                render_cache.timetables.move_to_end(idx)
+                return cached
+    
     violations = timetable.violations
-    sections = timetable.sections
+    if staff_ranks is None:
+        staff_ranks = compile_staff_preferences(staff_preferences)
+    section_fragments = render_cache.sections if render_cache is not None else {}
     
-    occupancy: Dict[str, List[str]] = {day: [""] * len(HOUR_SLOTS) for day in DAYS_ORDER}
+    # One <td> per grid cell, day-major, filled from each section's cell mask
+    occupancy: List[str] = ["<td></td>"] * (len(DAYS_ORDER) * len(HOUR_SLOTS))
     section_details = []
     
     uses_non_preferred_staff = False
     non_preferred_subjects = set()
 
-    for section in sections:
-        course_name = ""
-        if courses and section.subject_code in courses:
-            course_name = courses[section.subject_code].name
-        
-        schedule_summary = defaultdict(list)
-        for slot in section.time_slots:
-            schedule_summary[slot.day].append(
-                f"{minutes_to_time(slot.start_min)}-{minutes_to_time(slot.end_min)}"
-            )
-        
+    for section in timetable.sections:
         staff_status = "preferred"
-        staff_badge = ""
         # FIXED: Use consistent "non_preferred" (underscore) throughout
-        if staff_preferences and section.subject_code in staff_preferences:
-            if section.get_normalized_staff_name() not in staff_preferences[section.subject_code]:
+        if staff_ranks and section.subject_code in staff_ranks:
+            if section.staff_id not in staff_ranks[section.subject_code]:
                 staff_status = "non_preferred"
                 uses_non_preferred_staff = True
                 non_preferred_subjects.add(section.subject_code)
-                staff_badge = '<span style="background:#f59e0b; color:white; padding:2px 6px; border-radius:4px; font-size:0.75rem; margin-left:5px;">Non-Preferred</span>'
-                
         
-        section_details.append({
-            'subject': section.subject_code,
-            'course_name': course_name,
-            'section': section.section_code,
-            'faculty': section.faculty or "N/A",
-            'staff_status': staff_status,
-            'staff_badge': staff_badge,
-            'schedule': dict(schedule_summary)
-        })
+        fragment_key = (id(section), staff_status)
+        details = section_fragments.get(fragment_key)
+        if details is None:
+            course_name = ""
+            if courses and section.subject_code in courses:
+                course_name = courses[section.subject_code].name
+            details = section_fragments[fragment_key] = render_section_details_html(
+                section, course_name, staff_status
+            )
+        section_details.append(details)
 
-        for slot in section.time_slots:
-            if slot.day not in DAYS_ORDER:
-                continue
-            for hour_idx, (hs, he) in enumerate(HOUR_SLOTS):
-                hs_min = time_to_minutes(hs)
-                he_min = time_to_minutes(he)
-                if max(slot.start_min, hs_min) < min(slot.end_min, he_min):
-                    cell_content = f"{html.escape(section.subject_code)}<br>{html.escape(section.section_code)}"
-                    if staff_status == "non_preferred":
-                        cell_content += "<br><small style='color:#f59e0b;'>⚠ Non-Preferred</small>"
-                    occupancy[slot.day][hour_idx] = cell_content
+        cell_content = f"{html.escape(section.subject_code)}<br>{html.escape(section.section_code)}"
+        if staff_status == "non_preferred":
+            cell = f'<td class="np">{cell_content}<br><small>⚠ Non-Preferred</small></td>'
+        else:
+            cell = f'<td class="on">{cell_content}</td>'
+        mask = section.cell_mask
+        while mask:
+            low = mask & -mask
+            occupancy[low.bit_length() - 1] = cell
+            mask ^= low
     
     total_subjects = len(non_preferred_subjects)
     
     html_parts = [
-        '<div style="background:#0f172a;border-radius:12px;border:1px solid #1f2937;'
-        'margin-bottom:30px;overflow:hidden;">',
-        '<div style="background:#020617;padding:15px;border-bottom:1px solid #1f2937;display:flex;justify-content:space-between;align-items:center;">',
-        f'<h3 style="color:#e5e7eb;margin:0;font-size:1.2rem;">Timetable #{idx}</h3>',
+        '<div class="result-card"><div class="result-card-head">',
+        f'<h3>Timetable #{idx}</h3>',
     ]
     
     badges = []
     
     if violations and len(violations) > 0:
-        sorted_violations = sorted(violations, key=lambda v: v.priority)
-        highest_priority = sorted_violations[0].priority
-        
-        if highest_priority <= 2:
-            badge_color = "#ef4444"
-            badge_bg = "rgba(239,68,68,0.2)"
-        elif highest_priority <= 3:
-            badge_color = "#f59e0b"
-            badge_bg = "rgba(245,158,11,0.2)"
-        else:
-            badge_color = "#3b82f6"
-            badge_bg = "rgba(59,130,246,0.2)"
-            
-        badges.append(f'''
-            <div style="background:{badge_bg};color:{badge_color};padding:6px 12px;border-radius:20px;
-                font-size:0.85rem;font-weight:500;border:1px solid {badge_color};">
-                ⚠ {len(violations)} Constraint Violation(s)
-            </div>
-        ''')
+        highest_priority = min(v.priority for v in violations)
+        badge_class = next(
+            (cls for limit, cls in _VIOLATION_BADGE_CLASSES if highest_priority <= limit), "low"
+        )
+        badges.append(
+            f'<div class="badge {badge_class}">⚠ {len(violations)} Constraint Violation(s)</div>'
+        )
     
     if uses_non_preferred_staff and staff_strictness == "flexible":
-        badges.append(f'''
-            <div style="background:rgba(245,158,11,0.2);color:#f59e0b;padding:6px 12px;border-radius:20px;
-                font-size:0.85rem;font-weight:500;border:1px solid rgba(245,158,11,0.4);">
-                ⚠ Uses {total_subjects} Non-Preferred Subjects
-            </div>
-        ''')
+        badges.append(
+            f'<div class="badge staff">⚠ Uses {total_subjects} Non-Preferred Subjects</div>'
+        )
     
     if badges:
-        html_parts.append('<div style="display:flex; gap:8px;">' + ''.join(badges) + '</div>')
+        html_parts.append('<div class="badges">' + ''.join(badges) + '</div>')
     
-    html_parts.append('</div>')
-    html_parts.append('<div style="padding:15px;">')
+    html_parts.append('</div><div class="result-card-body">')
     
     if violations and len(violations) > 0:
-        html_parts.append('<div style="margin-bottom:20px;">')
-        html_parts.append('<h4 style="color:#e5e7eb;margin-top:0;margin-bottom:10px;font-size:1rem;">Constraint Violations:</h4>')
+        html_parts.append('<div class="result-violations"><h4>Constraint Violations:</h4>')
         html_parts.append(render_constraint_violations_html(violations))
         html_parts.append('</div>')
     
-    html_parts.append('<table style="width:100%;border-collapse:collapse;font-size:0.85rem;">')
-    html_parts.append('<thead><tr style="background:#020617;">')
-    html_parts.append('<th style="border:1px solid #1f2937;padding:10px 5px;color:#9ca3af;'
-    'font-weight:500;text-align:left;">Day</th>')
+    html_parts.append(_GRID_HEADER_HTML)
 
-    for start, end in HOUR_SLOTS:
-        html_parts.append(
-            f'<th style="border:1px solid #1f2937;padding:10px 5px;color:#9ca3af;'
-            f'font-weight:500;text-align:center;">{start}-{end}</th>'
-        )
-    html_parts.append('</tr></thead><tbody>')
-
-    for day in DAYS_ORDER:
+    for day_idx, day_cell in enumerate(_GRID_DAY_CELLS):
         html_parts.append('<tr>')
-        html_parts.append(
-            f'<td style="border:1px solid #1f2937;padding:10px 5px;font-weight:600;'
-            f'color:#e5e7eb;background:#020617;">{day}</td>'
-        )
-        for hour_idx in range(len(HOUR_SLOTS)):
-            cell_content = occupancy[day][hour_idx]
-            if cell_content:
-                # FIXED: Check for both underscore and hyphen variants
-                if "non_preferred" in cell_content or "non-preferred" in cell_content.lower():
-                    bg = "rgba(245,158,11,0.3)"
-                    fg = "white"
-                else:
-                    bg = "#1d4ed8"
-                    fg = "white"
-            else:
-                bg = "transparent"
-                fg = "#6b7280"
-            html_parts.append(
-                f'<td style="border:1px solid #1f2937;padding:10px 5px;'
-                f'background:{bg};color:{fg};text-align:center;">{cell_content}</td>'
-            )
+        html_parts.append(day_cell)
+        html_parts.extend(occupancy[day_idx * len(HOUR_SLOTS):(day_idx + 1) * len(HOUR_SLOTS)])
         html_parts.append('</tr>')
     html_parts.append('</tbody></table>')
 
-    html_parts.append(
-        '<div style="margin-top:15px;padding:15px;background:#020617;'
-        'border-radius:8px;border:1px solid #1f2937;">'
-    )
-    html_parts.append(
-        '<h4 style="color:#e5e7eb;margin-top:0;margin-bottom:10px;font-size:1rem;">'
-        'Section Details:</h4>'
-    )
-
-    for detail in section_details:
-        schedule_html = []
-        for day in DAYS_ORDER:
-            if day in detail['schedule']:
-                times = ", ".join(detail['schedule'][day])
-                schedule_html.append(f"{day}: {times}")
-        
-        faculty_display = detail['faculty']
-        if detail['staff_status'] == "non_preferred":
-            faculty_display = f'<span style="color:#f59e0b;">{html.escape(detail["faculty"])} ⚠</span>'
-        else:
-            faculty_display = html.escape(detail["faculty"])
-        
-        subject_display = f"{html.escape(detail['course_name'])} - {html.escape(detail['subject'])} - {html.escape(detail['section'])}" if detail['course_name'] else f"{html.escape(detail['subject'])} - {html.escape(detail['section'])}"
-        
-        html_parts.append(
-            '<div style="margin-bottom:8px;padding:10px;background:#0f172a;'
-            'border-radius:6px;border:1px solid #1f2937;">'
-            f'<div style="color:#e5e7eb;font-weight:500;">'
-            f'{subject_display} {detail["staff_badge"]}</div>'
-            f'<div style="color:#9ca3af;font-size:0.85rem;">Faculty: '
-            f'{faculty_display}</div>'
-            f'<div style="color:#9ca3af;font-size:0.85rem;">Schedule: '
-            f'{" | ".join(schedule_html)}</div>'
-            '</div>'
-        )
+    html_parts.append('<div class="section-details"><h4>Section Details:</h4>')
+    html_parts.extend(section_details)
 
     html_parts.append('</div></div></div>')
-    return ''.join(html_parts)
+    rendered = ''.join(html_parts)
+    
+    if render_cache is not None:
+        with render_cache.lock:
+            render_cache.timetables[idx] = rendered
+            while len(render_cache.timetables) > RENDER_CACHE_TIMETABLES:
+                render_cache.timetables.popitem(last=False)
+    return rendered
+
+def sample_coverage_text(stats: Dict[str, Any], found: int) -> str:
+    sampled_from = stats.get('sampled_from')
+    if sampled_from is None:
+        return f"Random sample of {found:,} - {stats.get('combinations_tried', 0):,} random combinations tried"
+    return f"Random sample of {found:,} of {sampled_from:,} conflict-free combinations"
 
 def render_timetable_html_paginated(
     timetables_with_violations: List[TimetableWithViolations],
@@ -1752,21 +3585,22 @@ def render_timetable_html_paginated(
     staff_preferences: Dict[str, List[str]] = None,
     staff_strictness: str = "strict",
     constraints_strictness: str = "strict",
-    stats: Dict[str, Any] = None
+    stats: Dict[str, Any] = None,
+    summary: ResultSummary = None,
+    render_cache: RenderCache = None
 ) -> str:
+    """Render one page of results.
+
+    Pass the result set's `summary` so the cost is O(page size);
+    without it the whole set is scanned. A `render_cache` kept with the
+    result set makes repeat page views reuse earlier fragments.
+    """
     if not timetables_with_violations:
-        return '''
-        <div style="text-align:center;padding:60px 40px;background:#0f172a;
-        border-radius:16px;border:1px solid #1f2937;">
-            <h3 style="color:#ef4444;font-size:1.5rem;margin-bottom:15px;">
-                ❌ No Valid Timetables Found
-            </h3>
-            <p style="color:#9ca3af;max-width:600px;margin:0 auto;">
-                The search explored possible combinations and found no valid timetables.
-                Try relaxing constraints or selecting different courses.
-            </p>
-        </div>
-        '''
+        return (
+            '<div class="result-message empty"><h3>❌ No Valid Timetables Found</h3>'
+            '<p>The search explored possible combinations and found no valid timetables. '
+            'Try relaxing constraints or selecting different courses.</p></div>'
+        )
 
     total_timetables = total or len(timetables_with_violations)
     total_pages = (total_timetables + per_page - 1) // per_page if total_timetables > 0 else 1
@@ -1775,32 +3609,25 @@ def render_timetable_html_paginated(
     end_idx = min(start_idx + per_page, len(timetables_with_violations))
     page_timetables = timetables_with_violations[start_idx:end_idx]
 
-    # Aggregate staff warnings efficiently
-    warnings_aggregator = StaffWarningsAggregator()
-    for timetable in timetables_with_violations:
-        warnings_aggregator.add_timetable(timetable, staff_preferences or {})
+    if summary is None:
+        summary = summarize_results(timetables_with_violations, staff_preferences)
+    staff_ranks = compile_staff_preferences(staff_preferences)
     
     html_parts = [
-        warnings_aggregator.get_html(),
-        
-        '<div style="margin-bottom:30px;padding:20px;background:#0f172a;'
-        'border-radius:12px;border:1px solid #1f2937;">',
-        '<h2 style="color:#e5e7eb;margin:0 0 10px 0;">RESULTS</h2>',
-        f'<p style="color:#9ca3af;margin:0 0 10px 0;">Found '
-        f'<strong style="color:#10b981">{total_timetables:,}</strong> valid timetables</p>',
-        f'<p style="color:#9ca3af;margin:0;">Showing timetables '
-        f'<strong>{start_idx + 1}-{end_idx}</strong> of {total_timetables}</p>',
+        summary.staff_warnings.get_html(),
+        
+        '<div class="result-panel results-head"><h2>RESULTS</h2>',
+        f'<p>Found <strong class="count">{total_timetables:,}</strong> valid timetables</p>',
+        f'<p>Showing timetables <strong>{start_idx + 1}-{end_idx}</strong> of {total_timetables}</p>',
     ]
     
     strictness_info = []
     strictness_info.append(f'<strong>Staff Strictness:</strong> {staff_strictness.capitalize()} mode')
     strictness_info.append(f'<strong>Constraints Strictness:</strong> {constraints_strictness.capitalize()} mode')
     
-    html_parts.append(f'''
-        <div style="display:grid;grid-template-columns:repeat(auto-fit, minmax(200px, 1fr));gap:10px;margin-top:10px;">
-            <div style="color:#9ca3af;font-size:0.9rem;">{" | ".join(strictness_info)}</div>
-        </div>
-    ''')
+    html_parts.append(
+        f'<div class="result-stats"><div>{" | ".join(strictness_info)}</div></div>'
+    )
     
     if stats:
         coverage = stats.get('coverage_percentage', 0.0)
@@ -1808,7 +3635,12 @@ def render_timetable_html_paginated(
         timeout_triggered = stats.get('timeout_triggered', False)
         max_results = stats.get('max_results', 10000)
         
-        if timeout_triggered:
+        sample_seed = stats.get('sample_seed')
+        if stats.get('searching'):
+            coverage_text = f"Still searching - {stats.get('found', total_timetables):,} timetables found so far"
+        elif sample_seed is not None:
+            coverage_text = sample_coverage_text(stats, total_timetables)
+        elif timeout_triggered:
             coverage_text = f"Timeout reached ({stats.get('timeout', 30)}s) - {coverage:.1f}% explored"
         elif coverage >= 99.9 and search_complete:
             coverage_text = "100% of search space explored"
@@ -1817,71 +3649,269 @@ def render_timetable_html_paginated(
         else:
             coverage_text = "Coverage not measured (large search space)"
         
-        if timeout_triggered:
+        if stats.get('searching'):
+            guarantee_text = "Best of the first timetables found; the full ranking follows when the search completes"
+        elif sample_seed is not None:
+            guarantee_text = f"Drawn uniformly at random from all valid timetables (seed {sample_seed})"
+        elif timeout_triggered:
             guarantee_text = "Search stopped early due to timeout"
+        elif stats.get('order') == 'index':
+            guarantee_text = "Every valid timetable, in search order"
         elif len(timetables_with_violations) >= max_results:
             guarantee_text = f"Search stopped at maximum results limit ({max_results})"
         elif coverage >= 99.9 and search_complete:
             guarantee_text = "All likely possibilities explored"
         else:
             guarantee_text = "Substantial search space explored"
+        if stats.get('diverse'):
+            guarantee_text = f"The {total_timetables} most different of the top {stats['diverse_pool']:,} ranked timetables"
         
-        html_parts.append(f'''
-            <div style="color:#9ca3af;font-size:0.9rem;margin-top:10px;">
-                <strong>Search Coverage:</strong> {coverage_text}<br>
-                <strong>Guarantee:</strong> {guarantee_text}
-            </div>
-        ''')
-    
-    if total_pages > 1:
+        search_more = ''
+        if stats.get('resumable') and not stats.get('searching'):
+            search_more = '<br><button class="step" onclick="searchMore()">Search more</button>'
         html_parts.append(
-            '<div style="margin-bottom:20px;padding:15px;background:#020617;'
-            'border-radius:8px;border:1px solid #1f2937;">'
-            '<div style="display:flex;gap:10px;flex-wrap:wrap;align-items:center;">'
+            f'<div class="result-note"><strong>Search Coverage:</strong> {coverage_text}<br>'
+            f'<strong>Guarantee:</strong> {guarantee_text}{search_more}</div>'
         )
+    
+    if total_pages > 1:
+        html_parts.append('<div class="pager"><div class="pager-buttons">')
         if page > 1:
-            html_parts.append(
-                f'<button onclick="loadPage({page-1})" '
-                'style="background:#3b82f6;color:white;border:none;padding:8px 16px;'
-                'border-radius:4px;cursor:pointer;font-weight:500;">← Previous</button>'
-            )
+            html_parts.append(f'<button class="step" onclick="loadPage({page-1})">← Previous</button>')
         start_page = max(1, page - 4)
         end_page = min(total_pages, start_page + 9)
         for p in range(start_page, end_page + 1):
             if p == page:
-                html_parts.append(
-                    '<button style="background:#10b981;color:white;border:none;'
-                    'padding:8px 12px;border-radius:4px;cursor:pointer;font-weight:bold;" disabled>'
-                    f'{p}</button>'
-                )
+                html_parts.append(f'<button class="current" disabled>{p}</button>')
             else:
-                html_parts.append(
-                    f'<button onclick="loadPage({p})" '
-                    'style="background:#374151;color:white;border:none;padding:8px 12px;'
-                    'border-radius:4px;cursor:pointer;">'
-                    f'{p}</button>'
-                )
+                html_parts.append(f'<button onclick="loadPage({p})">{p}</button>')
         if page < total_pages:
-            html_parts.append(
-                f'<button onclick="loadPage({page+1})" '
-                'style="background:#3b82f6;color:white;border:none;padding:8px 16px;'
-                'border-radius:4px;cursor:pointer;font-weight:500;">Next →</button>'
-            )
+            html_parts.append(f'<button class="step" onclick="loadPage({page+1})">Next →</button>')
         html_parts.append('</div></div>')
 
     html_parts.append('<div id="timetableResults">')
     for i, timetable in enumerate(page_timetables, start=start_idx + 1):
         html_parts.append(render_single_timetable_html(
-            timetable, i, courses, staff_preferences, staff_strictness
+            timetable, i, courses, staff_preferences, staff_strictness, staff_ranks, render_cache
         ))
     html_parts.append('</div>')
     
     return '\n'.join(html_parts)
 
+def timetable_items(
+    timetables: List[TimetableWithViolations],
+    scores: List[float],
+    index: CourseIndex,
+    staff_ranks: Dict[str, Dict[int, int]],
+    violation_types: Dict[Tuple[str, str, int], int]
+) -> List[Dict[str, Any]]:
+    """JSON form of each timetable; new violation kinds are added to `violation_types`."""
+    items = []
+    for timetable, score in zip(timetables, scores):
+        section_ids = [index.section_id(s) for s in timetable.sections]
+        non_preferred = [
+            section_id for section, section_id in zip(timetable.sections, section_ids)
+            if section.subject_code in staff_ranks
+            and section.staff_id not in staff_ranks[section.subject_code]
+        ]
+        violations = [
+            violation_types.setdefault((v.type, v.description, v.priority), len(violation_types))
+            for v in timetable.violations
+        ]
+        items.append({
+            "sections": section_ids,
+            "score": score,
+            "violations": violations,
+            "non_preferred": non_preferred,
+        })
+    return items
+
+def violation_types_payload(violation_types: Iterable[Tuple[str, str, int]]) -> List[Dict[str, Any]]:
+    return [{"type": t, "description": d, "priority": p} for t, d, p in violation_types]
+
+def results_payload(
+    timetables: List[TimetableWithViolations],
+    scores: List[float],
+    index: CourseIndex,
+    staff_ranks: Dict[str, Dict[int, int]],
+    summary: ResultSummary
+) -> Dict[str, Any]:
+    """A result set for client-side rendering.
+
+    Sections are catalog-relative ids into the /sections payload of the
+    same catalog version. Violations are indices into `violation_types`.
+    """
+    violation_types: Dict[Tuple[str, str, int], int] = {}
+    items = timetable_items(timetables, scores, index, staff_ranks, violation_types)
+    warnings = summary.staff_warnings
+    return {
+        "total": summary.total,
+        "timetables": items,
+        "violation_types": violation_types_payload(violation_types),
+        "summary": {
+            "violations_count": summary.violations_count,
+            "timetables_with_violations": summary.timetables_with_violations,
+            "non_preferred_timetables": warnings.timetable_count_with_non_preferred,
+            "non_preferred_subjects": len(warnings.subjects_with_non_preferred),
+        },
+    }
+
+# ========== HTTP CACHING ==========
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this aren't worth compressing
+COMPRESS_MIN_BYTES = 512
+
+def strong_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+def json_bytes(content: Any) -> bytes:
+    """Encode like JSONResponse does."""
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+@dataclass
+class PrecompressedBody:
+    """A response body encoded once, with compressed variants and a strong ETag."""
+    identity: bytes
+    media_type: str
+    etag: str
+    # Content-Encoding -> compressed bytes
+    encoded: Dict[str, bytes] = field(default_factory=dict)
+    
+    @classmethod
+    def build(cls, body: bytes, media_type: str, level: int = 9) -> "PrecompressedBody":
+        encoded = {}
+        if len(body) >= COMPRESS_MIN_BYTES:
+            if brotli is not None:
+                encoded["br"] = brotli.compress(body, quality=11 if level >= 9 else 5)
+            encoded["gzip"] = gzip.compress(body, compresslevel=level, mtime=0)
+        return cls(body, media_type, strong_etag(body), encoded)
+    
+    def variant_etag(self, encoding: Optional[str]) -> str:
+        """Each representation gets its own strong ETag."""
+        return self.etag if encoding is None else f'{self.etag[:-1]}-{encoding}"'
+
+def accepted_encodings(request: Request) -> Set[str]:
+    accepted = set()
+    for part in request.headers.get("accept-encoding", "").split(","):
+        coding, _, params = part.partition(";")
+        params = params.strip().lower()
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if coding.strip():
+            accepted.add(coding.strip().lower())
+    return accepted
+
+def etag_matches(request: Request, etags: Iterable[str]) -> bool:
+    """True if the client's If-None-Match already names one of `etags`."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {tag.strip() for tag in header.split(",")}
+    if "*" in candidates:
+        return True
+    return any(etag in candidates or f"W/{etag}" in candidates for etag in etags)
+
+def precompressed_response(request: Request, body: PrecompressedBody,
+                           headers: Dict[str, str] = None,
+                           cache_control: str = "private, no-cache") -> Response:
+    """Serve the best encoding the client accepts, or 304 if it has it already."""
+    accepted = accepted_encodings(request)
+    encoding = next(
+        (e for e in ("br", "gzip") if e in body.encoded and (e in accepted or "*" in accepted)),
+        None
+    )
+    headers = dict(headers or {})
+    headers.update({
+        "ETag": body.variant_etag(encoding),
+        "Cache-Control": cache_control,
+        "Vary": "Accept-Encoding"
+    })
+    if etag_matches(request, [body.variant_etag(e) for e in (None, *body.encoded)]):
+        return Response(status_code=304, headers=headers)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(body.encoded.get(encoding, body.identity), media_type=body.media_type, headers=headers)
+
+def encode_json(content: Any, level: int = 6) -> PrecompressedBody:
+    """Serialize and compress a JSON response built per request."""
+    return PrecompressedBody.build(json_bytes(content), "application/json", level=level)
+
+async def cached_json_response(request: Request, content: Any, headers: Dict[str, str] = None) -> Response:
+    """JSON response built per request, with the same ETag/compression
+    handling; encoded on the render pool."""
+    body = await off_loop(encode_json, content)
+    return precompressed_response(request, body, headers)
+
+def encode_catalog_json(snapshot: CatalogSnapshot, key: str, build: Callable[[], Any]) -> PrecompressedBody:
+    """Encode a catalog-derived response once per catalog version."""
+    body = snapshot.responses.get(key)
+    if body is None:
+        body = snapshot.responses[key] = PrecompressedBody.build(json_bytes(build()), "application/json")
+    return body
+
+async def catalog_json_body(snapshot: CatalogSnapshot, key: str, build: Callable[[], Any]) -> PrecompressedBody:
+    """encode_catalog_json() with the compression off the event loop; the
+    subject and section lists are already encoded when a version is
+    published (see prepare_catalog_responses)."""
+    body = snapshot.responses.get(key)
+    if body is None:
+        body = await off_loop(encode_catalog_json, snapshot, key, build)
+    return body
+
+class StaticPage:
+    """An HTML file kept precompressed in memory, re-read when it changes on disk."""
+    def __init__(self, path: str, cache_control: str):
+        self.path = path
+        self.cache_control = cache_control
+        self._stat_key = None
+        self._body: Optional[PrecompressedBody] = None
+        self._lock = threading.Lock()
+    
+    def stat_key(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+    
+    def body(self) -> Optional[PrecompressedBody]:
+        """The current body, read and compressed again if the file changed."""
+        stat_key = self.stat_key()
+        if stat_key is None:
+            return None
+        with self._lock:
+            if stat_key != self._stat_key:
+                with open(self.path, "rb") as f:
+                    self._body = PrecompressedBody.build(f.read(), "text/html; charset=utf-8")
+                self._stat_key = stat_key
+            return self._body
+    
+    async def response(self, request: Request) -> Optional[Response]:
+        """Only the stat and lookup run on the event loop; compression doesn't."""
+        stat_key = self.stat_key()
+        if stat_key is None:
+            return None
+        body = self._body if stat_key == self._stat_key else await off_loop(self.body)
+        return precompressed_response(request, body, cache_control=self.cache_control) if body else None
+
+front_page = StaticPage("front.html", cache_control="private, no-cache")
+login_page_file = StaticPage("login.html", cache_control="public, no-cache")
+
 # ========== ROUTES ==========
 @app.get("/login")
-async def login_page():
-    return FileResponse("login.html")
+async def login_page(request: Request):
+    response = await login_page_file.response(request)
+    if response is None:
+        return HTMLResponse("<h2>login.html not found.</h2>", status_code=404)
+    return response
 
 @app.get("/logout")
 async def logout():
@@ -1994,27 +4024,58 @@ async def auth_guard(request: Request, call_next):
 @app.get("/")
 async def serve_front(request: Request):
     """Serve the frontend HTML."""
-    if os.path.exists("front.html"):
-        return FileResponse("front.html")
+    response = await front_page.response(request)
+    if response is not None:
+        return response
     return HTMLResponse("<h2>front.html not found. Put front.html in same folder.</h2>")
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint for orchestrators."""
+    default_catalog = catalog_registry.cache_for(DEFAULT_CATALOG).get()
     return JSONResponse({
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
         "service": "timetable-generator",
-        "version": "3.0.0"
+        "version": "3.0.0",
+        "catalog_version": default_catalog.version if default_catalog else None,
+        "catalog_watcher": catalog_registry.watcher_mode(DEFAULT_CATALOG),
+        "catalogs_loaded": catalog_registry.loaded_ids(),
+        "latency": latency_metrics.summary()
     })
 
+def unknown_catalog_response(catalog_id: str) -> JSONResponse:
+    return JSONResponse({"error": f"Unknown catalog '{catalog_id}'"}, status_code=404)
+
+@app.get("/catalogs")
+async def catalogs_list():
+    """List the catalogs this deployment serves."""
+    loaded = set(catalog_registry.loaded_ids())
+    catalogs = []
+    for catalog_id in catalog_registry.ids():
+        snapshot = catalog_registry.cache_for(catalog_id).get() if catalog_id in loaded else None
+        catalogs.append({
+            "id": catalog_id,
+            "default": catalog_id == DEFAULT_CATALOG,
+            "loaded": snapshot is not None,
+            "catalog_version": snapshot.version if snapshot else None,
+            "courses": len(snapshot.courses) if snapshot else None
+        })
+    return JSONResponse(catalogs)
+
 @app.get("/subjects")
-async def subjects_list():
+async def subjects_list(request: Request, catalog_id: str = Query("", alias="catalog")):
     """Get list of all available subjects."""
-    courses = load_courses()
-    if not courses:
+    if catalog_registry.resolve(catalog_id) is None:
+        return unknown_catalog_response(catalog_id)
+    catalog = await get_catalog(catalog_id)
+    if not catalog or not catalog.courses:
         return JSONResponse({"error": "No courses loaded. Check output.txt file."}, status_code=400)
     
+    body = await catalog_json_body(catalog, "subjects", partial(subjects_payload, catalog.courses))
+    return precompressed_response(request, body, headers={"X-Catalog-Version": str(catalog.version)})
+
+def subjects_payload(courses: Dict[str, Course]) -> List[Dict[str, Any]]:
     subjects = []
     for code, course in sorted(courses.items()):
         subjects.append({
@@ -2036,23 +4097,611 @@ async def subjects_list():
         "display": "ANYTHING - All subjects"
     })
     
-    return JSONResponse(subjects)
+    return subjects
+
+def sections_payload(catalog: CatalogSnapshot) -> Dict[str, Any]:
+    """Every section of a catalog version, in catalog-relative id order.
+
+    Each section is [course position, section code, faculty, grid cells,
+    time slots], with cells numbered day * len(hour_slots) + hour slot and
+    slots as [day index, start minute, end minute].
+    """
+    cells_per_day = len(HOUR_SLOTS)
+    sections = []
+    for position, course in enumerate(catalog.courses.values()):
+        for section in course.sections:
+            mask = section.cell_mask
+            sections.append([
+                position,
+                section.section_code,
+                section.faculty,
+                [cell for cell in range(len(DAYS_ORDER) * cells_per_day) if mask >> cell & 1],
+                [
+                    [DAY_INDEX[slot.day], slot.start_min, slot.end_min]
+                    for slot in section.time_slots if slot.day in DAY_INDEX
+                ],
+            ])
+    return {
+        "catalog": catalog.catalog_id,
+        "version": catalog.version,
+        "days": DAYS_ORDER,
+        "hour_slots": HOUR_SLOTS,
+        "courses": [[code, course.name] for code, course in catalog.courses.items()],
+        "sections": sections,
+    }
+
+def prepare_catalog_responses(snapshot: CatalogSnapshot):
+    """Encode the /subjects and /sections bodies of a new version before
+    it is published (CourseCache.swap's `prepare`, in the loading thread)."""
+    try:
+        encode_catalog_json(snapshot, "subjects", partial(subjects_payload, snapshot.courses))
+        encode_catalog_json(snapshot, "sections", partial(sections_payload, snapshot))
+    except Exception as e:
+        logger.warning(f"Could not pre-encode catalog responses: {e}")
+
+@app.get("/sections")
+async def sections_list(request: Request, catalog_id: str = Query("", alias="catalog")):
+    """Section catalog that JSON /generate results refer to by id."""
+    if catalog_registry.resolve(catalog_id) is None:
+        return unknown_catalog_response(catalog_id)
+    catalog = await get_catalog(catalog_id)
+    if not catalog or not catalog.courses:
+        return JSONResponse({"error": "No courses loaded. Check output.txt file."}, status_code=400)
+    
+    body = await catalog_json_body(catalog, "sections", partial(sections_payload, catalog))
+    return precompressed_response(request, body, headers={"X-Catalog-Version": str(catalog.version)})
+
+@app.get("/subjects/search")
+async def subjects_search(q: str = "", limit: int = 20, catalog_id: str = Query("", alias="catalog")):
+    """Ranked subject matches on code, name, type and faculty (for autocomplete).
+
+    An empty `q` returns the first `limit` subjects by code, a bounded
+    first page for the subject list.
+    """
+    if catalog_registry.resolve(catalog_id) is None:
+        return unknown_catalog_response(catalog_id)
+    catalog = await get_catalog(catalog_id)
+    if not catalog or not catalog.courses:
+        return JSONResponse({"error": "No courses loaded. Check output.txt file."}, status_code=400)
+    
+    results = []
+    for code, score in catalog.index.search(q[:200], limit=max(1, min(limit, 100))):
+        course = catalog.courses[code]
+        results.append({
+            "code": code,
+            "name": course.name,
+            "credits": course.credits,
+            "type": course.course_type,
+            "sections": len(course.sections),
+            "has_sections": len(course.sections) > 0,
+            "display": f"{code} - {course.name} ({len(course.sections)} sections)",
+            "score": round(score, 3)
+        })
+    
+    return JSONResponse(results, headers={"X-Catalog-Version": str(catalog.version)})
 
 @app.get("/staff/{subject_code}")
-async def get_staff(subject_code: str):
+async def get_staff(request: Request, subject_code: str, catalog_id: str = Query("", alias="catalog")):
     """Get staff members for a subject."""
-    courses = load_courses()
-    course = get_course(courses, subject_code)
+    if catalog_registry.resolve(catalog_id) is None:
+        return unknown_catalog_response(catalog_id)
+    catalog = await get_catalog(catalog_id)
+    code = catalog.index.resolve(subject_code) if catalog else None
     
-    if not course:
+    if not code:
         return JSONResponse({"error": "Subject not found"}, status_code=404)
     
-    staff = set()
-    for sec in course.sections:
-        if sec.faculty:
-            staff.add(sec.faculty.strip())
+    body = await catalog_json_body(catalog, f"staff:{code}", lambda: catalog.index.staff[code])
+    return precompressed_response(request, body, headers={"X-Catalog-Version": str(catalog.version)})
+
+@app.get("/staff")
+async def get_staff_bulk(request: Request, codes: str = "", catalog_id: str = Query("", alias="catalog")):
+    """Staff lists for several subjects in one response (?codes=A,B,C).
+
+    Served from the catalog's precomputed staff index with an ETag, so
+    an unchanged selection revalidates with a 304.
+    """
+    if len(codes) > 10000:
+        raise HTTPException(status_code=413, detail="Codes input too large")
+    if catalog_registry.resolve(catalog_id) is None:
+        return unknown_catalog_response(catalog_id)
+    catalog = await get_catalog(catalog_id)
+    if not catalog or not catalog.courses:
+        return JSONResponse({"error": "No courses loaded. Check output.txt file."}, status_code=400)
+    
+    staff: Dict[str, List[str]] = {}
+    not_found: List[str] = []
+    for raw in codes.split(","):
+        if not raw.strip():
+            continue
+        code = catalog.index.resolve(raw)
+        if code:
+            staff[code] = catalog.index.staff[code]
+        else:
+            not_found.append(raw.strip())
     
-    return JSONResponse(sorted(list(staff)))
+    return await cached_json_response(
+        request,
+        {"staff": staff, "not_found": not_found},
+        headers={"X-Catalog-Version": str(catalog.version)}
+    )
+
+def json_results_payload(entry: CachedResult, catalog: CatalogSnapshot, scorer: TimetableScorer,
+                         staff_ranks: Dict[str, Dict[int, int]], settings: Dict[str, Any]) -> Dict[str, Any]:
+    if entry.scores is None:
+        entry.scores = scorer.scores(entry.timetables, catalog.courses)
+    payload = results_payload(entry.timetables, entry.scores, catalog.index, staff_ranks, entry.summary)
+    payload.update(
+        catalog=catalog.catalog_id,
+        catalog_version=catalog.version,
+        settings=dict(settings, staff_warnings=len(entry.staff_warnings)),
+        stats=dict(entry.stats, catalog_version=catalog.version),
+    )
+    return payload
+
+def json_results_body(entry: CachedResult, catalog: CatalogSnapshot, scorer: TimetableScorer,
+                      staff_ranks: Dict[str, Dict[int, int]], settings: Dict[str, Any]) -> "PrecompressedBody":
+    """JSON /generate body, encoded once per result set and catalog version.
+
+    `settings` must be determined by the result cache key.
+    """
+    if entry.json_body is None or entry.json_body[0] != catalog.version:
+        payload = json_results_payload(entry, catalog, scorer, staff_ranks, settings)
+        entry.json_body = (catalog.version, PrecompressedBody.build(json_bytes(payload), "application/json", level=6))
+    return entry.json_body[1]
+
+def page_payload(entry: CachedResult, catalog: CatalogSnapshot, scorer: TimetableScorer,
+                 staff_ranks: Dict[str, Dict[int, int]], settings: Dict[str, Any],
+                 page_num: int, per_page: int = 10) -> Dict[str, Any]:
+    """JSON /generate body for one page of a result set (order=index, or
+    `per_page`); totals and summary still cover the whole set."""
+    total = len(entry.timetables)
+    total_pages = max(1, (total + per_page - 1) // per_page)
+    page_num = max(1, min(page_num, total_pages))
+    start = (page_num - 1) * per_page
+    timetables = entry.timetables[start:start + per_page]
+    if entry.scores is not None:
+        scores = entry.scores[start:start + per_page]
+    else:
+        scores = scorer.scores(timetables, catalog.courses)
+    payload = results_payload(timetables, scores, catalog.index, staff_ranks, entry.summary)
+    payload.update(
+        page=page_num,
+        per_page=per_page,
+        offset=start,
+        catalog=catalog.catalog_id,
+        catalog_version=catalog.version,
+        settings=dict(settings, staff_warnings=len(entry.staff_warnings)),
+        stats=dict(entry.stats, catalog_version=catalog.version),
+    )
+    return payload
+
+def selected_course_dicts(courses: Dict[str, Course], selected_codes: List[str]) -> Dict[str, Dict[str, Any]]:
+    """The selected courses as plain dicts, in catalog order, for the process pool."""
+    selected = set(selected_codes)
+    return {code: course.to_dict() for code, course in courses.items() if code in selected}
+
+async def search_and_cache(catalog: CatalogSnapshot, selected_codes: List[str], whole_catalog: bool,
+                           max_results: int, search_kwargs: Dict[str, Any], scorer: TimetableScorer,
+                           cache_key: str, progress=None, resume: Optional[CachedResult] = None) -> CachedResult:
+    """Run a search in the process pool, rank it and add it to the result cache.
+
+    With `resume`, an earlier result of the same search that stopped early,
+    the search continues from its checkpoint and the result combines both.
+    """
+    courses = catalog.courses
+    # Convert courses to dict for process pool (O(catalog) for whole-catalog searches)
+    courses_dict = await off_loop(selected_course_dicts, courses, selected_codes)
+    
+    timetables, staff_warnings, staff_deviations, stats = await run_god_search_async(
+        courses_dict,
+        selected_codes,
+        max_results=max_results,
+        timeout=SAMPLE_TIMEOUT if search_kwargs.get('sample') else TIMETABLE_TIMEOUT,
+        progress=progress,
+        checkpoint=resume.checkpoint if resume is not None else None,
+        **search_kwargs
+    )
+    checkpoint = stats.pop('checkpoint', None)
+    stats['catalog_version'] = catalog.version
+    stats['resumable'] = checkpoint is not None
+    if resume is not None:
+        timetables = resume.timetables + timetables
+        staff_warnings = resume.staff_warnings + [w for w in staff_warnings if w not in resume.staff_warnings]
+        staff_deviations = resume.staff_deviations
+        violations_by_type = defaultdict(int, resume.stats.get('violations_by_type', {}))
+        for violation_type, count in stats.get('violations_by_type', {}).items():
+            violations_by_type[violation_type] += count
+        stats.update(
+            valid_timetables=len(timetables),
+            total_violations=sum(violations_by_type.values()),
+            violations_by_type=dict(violations_by_type),
+            max_results=len(resume.timetables) + max_results,
+            resumed=resume.stats.get('resumed', 0) + 1,
+        )
+    
+    # Sort timetables by score
+    timetables = await off_loop(scorer.rank, timetables, courses)
+    summary = await off_loop(summarize_results, timetables, search_kwargs["staff_preferences"])
+    entry = CachedResult(
+        timetables=timetables,
+        staff_warnings=staff_warnings,
+        staff_deviations=staff_deviations,
+        stats=stats,
+        depends_on=set(selected_codes),
+        whole_catalog=whole_catalog,
+        catalog_version=catalog.version,
+        catalog_id=catalog.catalog_id,
+        summary=summary,
+        render_cache=RenderCache(),
+        checkpoint=checkpoint
+    )
+    result_cache.put(cache_key, entry)
+    return entry
+
+def diverse_result(entry: CachedResult, count: int, staff_preferences: Dict[str, List[str]]) -> CachedResult:
+    """`count` maximally different timetables of a ranked result set (see
+    select_diverse), kept with it for later requests."""
+    diverse = entry.diverse.get(count)
+    if diverse is None:
+        timetables = select_diverse(entry.timetables, count)
+        diverse = CachedResult(
+            timetables=timetables,
+            staff_warnings=entry.staff_warnings,
+            staff_deviations=entry.staff_deviations,
+            stats=dict(entry.stats, diverse=count, diverse_pool=min(len(entry.timetables), DIVERSE_POOL)),
+            depends_on=entry.depends_on,
+            whole_catalog=entry.whole_catalog,
+            catalog_version=entry.catalog_version,
+            catalog_id=entry.catalog_id,
+            summary=summarize_results(timetables, staff_preferences),
+            render_cache=RenderCache()
+        )
+        entry.diverse[count] = diverse
+    return diverse
+
+@dataclass
+class PendingSearch:
+    """A search finishing in the background after an early response, with
+    the timetables it has sent back so far (see ResultBatcher)."""
+    catalog_version: int
+    started: float
+    task: Optional["asyncio.Task"] = None
+    collector: Optional["asyncio.Task"] = None
+    timetables: List[TimetableWithViolations] = field(default_factory=list)
+    found: int = 0
+    # Set whenever more timetables arrive or the search ends
+    updated: asyncio.Event = field(default_factory=asyncio.Event)
+    # ((timetables, found), result ranked from them) for the latest response
+    provisional: Optional[Tuple[Tuple[int, int], CachedResult]] = None
+
+# Result cache key -> search still running for it; only used on the event loop
+pending_searches: Dict[str, PendingSearch] = {}
+
+def pending_search(cache_key: str, catalog_version: int) -> Optional[PendingSearch]:
+    pending = pending_searches.get(cache_key)
+    if pending is not None and pending.catalog_version == catalog_version:
+        return pending
+    return None
+
+def start_background_search(catalog: CatalogSnapshot, cache_key: str,
+                            search: Callable[..., Any]) -> PendingSearch:
+    """Start `search` (see search_and_cache) without waiting for it; the
+    complete result goes to the result cache."""
+    progress = get_stream_manager().Queue()
+    pending = PendingSearch(catalog.version, time.monotonic())
+    pending.task = asyncio.ensure_future(search(progress=progress))
+    pending.collector = asyncio.ensure_future(collect_progress(pending, progress, catalog.courses))
+    pending_searches[cache_key] = pending
+    
+    def finished(task: "asyncio.Task"):
+        if pending_searches.get(cache_key) is pending:
+            del pending_searches[cache_key]
+        pending.updated.set()
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Background search failed: {task.exception()}")
+    
+    pending.task.add_done_callback(finished)
+    return pending
+
+async def collect_progress(pending: PendingSearch, progress, courses: Dict[str, Course]):
+    """Add what a background search sends to its progress queue to `pending`."""
+    while True:
+        try:
+            batches = await read_progress(progress)
+        except queue.Empty:
+            if pending.task.done():
+                return
+            continue
+        closed = batches[-1] is None
+        if closed:
+            batches.pop()
+        pending.timetables.extend(timetables_from_batches(batches, courses))
+        counts = [batch for batch in batches if isinstance(batch, int)]
+        pending.found = counts[-1] if counts else max(pending.found, len(pending.timetables))
+        pending.updated.set()
+        if closed:
+            return
+
+async def wait_for_early_results(pending: PendingSearch) -> Optional[CachedResult]:
+    """Wait until `pending` has enough timetables for an early response.
+
+    Returns the complete result instead if the search finishes first.
+    """
+    wanted = max(1, min(EARLY_RESULTS, STREAM_PREVIEW_RESULTS))
+    deadline = pending.started + EARLY_RESPONSE_SECONDS
+    while not pending.task.done():
+        remaining = deadline - time.monotonic()
+        if len(pending.timetables) >= wanted or (pending.timetables and remaining <= 0):
+            return None
+        pending.updated.clear()
+        try:
+            await asyncio.wait_for(pending.updated.wait(), timeout=remaining if remaining > 0 else None)
+        except asyncio.TimeoutError:
+            pass
+    return await asyncio.shield(pending.task)
+
+async def early_result(pending: PendingSearch, catalog: CatalogSnapshot, scorer: TimetableScorer,
+                       staff_preferences: Dict[str, List[str]]) -> CachedResult:
+    """A result set ranked from the timetables `pending` has found so far,
+    flagged `searching` in its stats. Reused until more are found."""
+    progress = (len(pending.timetables), pending.found)
+    if pending.provisional is None or pending.provisional[0] != progress:
+        timetables = await off_loop(scorer.rank, pending.timetables[:progress[0]], catalog.courses)
+        summary = await off_loop(summarize_results, timetables, staff_preferences)
+        entry = CachedResult(
+            timetables=timetables,
+            staff_warnings=[],
+            staff_deviations=[],
+            stats={
+                "searching": True,
+                "found": progress[1],
+                "time_elapsed": time.monotonic() - pending.started,
+                "search_complete": False,
+                "coverage_percentage": 0.0,
+                "catalog_version": catalog.version,
+            },
+            depends_on=set(),
+            whole_catalog=False,
+            catalog_version=catalog.version,
+            catalog_id=catalog.catalog_id,
+            summary=summary,
+            render_cache=RenderCache()
+        )
+        pending.provisional = (progress, entry)
+    return pending.provisional[1]
+
+async def join_search(pending: PendingSearch, progress=None) -> CachedResult:
+    """`search` for a stream that joins a background search: its result,
+    without previews (the progress queue is closed at once)."""
+    if progress is not None:
+        progress.put(None)
+    return await asyncio.shield(pending.task)
+
+def drain_queue(source, timeout: float) -> List[Any]:
+    """Wait up to `timeout` for one item, then take whatever else is queued."""
+    items = [source.get(timeout=timeout)]
+    while items[-1] is not None:
+        try:
+            items.append(source.get_nowait())
+        except queue.Empty:
+            break
+    return items
+
+async def read_progress(progress) -> List[Any]:
+    """drain_queue() on the progress pool, so waiting searches never hold
+    default executor threads; raises queue.Empty after half a second."""
+    return await asyncio.get_running_loop().run_in_executor(get_progress_pool(), drain_queue, progress, 0.5)
+
+def ndjson_line(message: Dict[str, Any]) -> bytes:
+    return json_bytes(message) + b"\n"
+
+def timetables_from_batches(batches: List[Any], courses: Dict[str, Course]) -> List[TimetableWithViolations]:
+    """The timetables in batches sent by a ResultBatcher (counts are skipped)."""
+    return [
+        TimetableWithViolations(
+            sections=[courses[code].sections[index] for code, index in refs],
+            violations=[ConstraintViolation(*v) for v in violations]
+        )
+        for batch in batches if not isinstance(batch, int) for refs, violations in batch
+    ]
+
+def stream_batch_line(batches: List[Any], catalog: CatalogSnapshot, scorer: TimetableScorer,
+                      staff_ranks: Dict[str, Dict[int, int]],
+                      violation_types: Dict[Tuple[str, str, int], int]) -> Optional[bytes]:
+    """The "timetables" message for batches drained from a search's queue, or
+    None if they only carried counts. Adds new violations to `violation_types`.
+    """
+    courses = catalog.courses
+    timetables = timetables_from_batches(batches, courses)
+    if not timetables:
+        return None
+    known_types = len(violation_types)
+    items = timetable_items(
+        timetables, scorer.scores(timetables, courses), catalog.index, staff_ranks, violation_types
+    )
+    return ndjson_line({
+        "type": "timetables",
+        "timetables": items,
+        "violation_types": violation_types_payload(list(violation_types)[known_types:]),
+    })
+
+async def stream_results(started: float, catalog: CatalogSnapshot, entry: Optional[CachedResult],
+                         search: Callable[..., Any], scorer: TimetableScorer,
+                         staff_ranks: Dict[str, Dict[int, int]], settings: Dict[str, Any],
+                         on_done: Callable[[CachedResult], None],
+                         paging: Optional[Tuple[int, int]] = None):
+    """NDJSON /generate body: "start", then the first timetables in the order
+    the search finds them ("timetables" batches) and the running count
+    ("progress"), then "done" with the ranked result set (the JSON format's
+    payload; just one page of it with `paging`), or "error".
+
+    `search(progress=queue)` runs the search when `entry` is not cached.
+    """
+    yield ndjson_line({
+        "type": "start",
+        "catalog": catalog.catalog_id,
+        "catalog_version": catalog.version,
+        "settings": settings,
+    })
+    first_sent = False
+    
+    if entry is None:
+        progress = get_stream_manager().Queue()
+        task = asyncio.ensure_future(search(progress=progress))
+        violation_types: Dict[Tuple[str, str, int], int] = {}
+        finished = False
+        while not finished:
+            try:
+                batches = await read_progress(progress)
+            except queue.Empty:
+                if task.done():
+                    break
+                continue
+            if batches[-1] is None:
+                finished = True
+                batches.pop()
+            
+            message = await off_loop(
+                stream_batch_line, batches, catalog, scorer, staff_ranks, violation_types
+            )
+            if message is not None:
+                if not first_sent:
+                    first_sent = True
+                    elapsed = time.monotonic() - started
+                    latency_metrics.record("time_to_first_timetable_stream", elapsed)
+                    logger.info(f"Streamed first timetable after {elapsed * 1000:.0f} ms")
+                yield message
+            counts = [batch for batch in batches if isinstance(batch, int)]
+            if counts:
+                yield ndjson_line({"type": "progress", "found": counts[-1]})
+        
+        try:
+            entry = await task
+        except Exception as e:
+            logger.error(f"Search failed: {e}", exc_info=True)
+            yield ndjson_line({"type": "error", "error": "Search failed"})
+            return
+    
+    if paging is not None:
+        payload = await off_loop(page_payload, entry, catalog, scorer, staff_ranks, settings, *paging)
+    else:
+        payload = await off_loop(json_results_payload, entry, catalog, scorer, staff_ranks, settings)
+    done = await off_loop(ndjson_line, dict(payload, type="done"))
+    if not first_sent and entry.timetables:
+        latency_metrics.record("time_to_first_timetable_stream", time.monotonic() - started)
+    yield done
+    asyncio.get_running_loop().run_in_executor(None, on_done, entry)
+
+def log_user_activity(email: str, selected_subjects: str, constraints: Dict[str, Any],
+                      staff_preferences: Dict[str, List[str]], entry: CachedResult):
+    from supabase_client import supabase
+    try:
+        supabase.table("user_activity").insert({
+            "email": email,
+            "selected_subjects": selected_subjects,
+            "constraints": constraints,
+            "staff_preferences": staff_preferences,
+            "results_count": len(entry.timetables),
+            "coverage": entry.stats.get("coverage_percentage"),
+            "search_time": entry.stats.get("time_elapsed")
+        }).execute()
+    except Exception as e:
+        logger.warning(f"Supabase insert error: {e}")
+
+def render_generate_page(entry: CachedResult, courses: Dict[str, Course], catalog_version: int,
+                         page_num: int, selected_count: int, staff_preferences: Dict[str, List[str]],
+                         priority_mode: str, staff_strictness: str, constraints_strictness: str) -> str:
+    """The HTML /generate response: search statistics and one page of results."""
+    timetables = entry.timetables
+    staff_warnings = entry.staff_warnings
+    stats = dict(entry.stats, catalog_version=catalog_version)
+    summary = entry.summary
+    
+    # Prepare statistics display
+    priority_stats = ""
+    if priority_mode == 'staff':
+        priority_stats = f'''
+        <div><strong>Priority Mode:</strong> Staff First</div>
+        '''
+    else:
+        priority_stats = f'''
+        <div><strong>Priority Mode:</strong> Constraints First</div>
+        '''
+    
+    strictness_stats = f'''
+    <div><strong>Staff Strictness:</strong> {staff_strictness.capitalize()} mode</div>
+    <div><strong>Constraints Strictness:</strong> {constraints_strictness.capitalize()} mode</div>
+    '''
+    
+    staff_stats = ""
+    if staff_preferences:
+        staff_stats = f'''
+        <div><strong>Staff preferences:</strong> Applied to {len(staff_preferences)} courses</div>
+        <div><strong>Warnings:</strong> {len(staff_warnings)} courses had unavailable preferred staff</div>
+        '''
+    
+    constraint_stats = ""
+    if constraints_strictness == 'flexible':
+        constraint_stats = f'''
+        <div><strong>Constraint Violations:</strong> {summary.violations_count} total</div>
+        <div><strong>Timetables with violations:</strong> {summary.timetables_with_violations} of {summary.total}</div>
+        '''
+    
+    coverage = stats.get('coverage_percentage', 0.0)
+    search_complete = stats.get('search_complete', False)
+    
+    if stats.get('searching'):
+        coverage_text = "Still searching"
+        guarantee_text = "Results so far; the full ranking follows when the search completes"
+    elif stats.get('order') == 'index':
+        coverage_text = "100% of search space counted"
+        guarantee_text = "Every valid timetable, in search order"
+    elif stats.get('sample_seed') is not None:
+        coverage_text = sample_coverage_text(stats, len(timetables))
+        guarantee_text = f"Drawn uniformly at random from all valid timetables (seed {stats['sample_seed']})"
+    elif coverage >= 99.9 and search_complete:
+        coverage_text = "100% of search space explored"
+        guarantee_text = "All likely possibilities explored"
+    elif coverage > 0:
+        coverage_text = f"{coverage:.1f}% of search space explored"
+        guarantee_text = "Substantial search space explored"
+    else:
+        coverage_text = "Search space explored with pruning"
+        guarantee_text = "Substantial search space explored"
+    if stats.get('diverse'):
+        guarantee_text = f"The {len(timetables)} most different of the top {stats['diverse_pool']:,} ranked timetables"
+    
+    stats_html = f'''
+    <div class="result-panel">
+        <h3>SEARCH STATISTICS</h3>
+        <div class="result-stats">
+            {priority_stats}
+            {strictness_stats}
+            <div><strong>Search time:</strong> {stats.get('time_elapsed', 0):.2f} seconds</div>
+            <div><strong>Total courses:</strong> {selected_count}</div>
+            <div><strong>Valid timetables found:</strong> {len(timetables):,}</div>
+            <div><strong>Coverage:</strong> {coverage_text}</div>
+            <div><strong>Guarantee:</strong> {guarantee_text}</div>
+            {staff_stats}
+            {constraint_stats}
+        </div>
+    </div>
+    '''
+
+    html_out = render_timetable_html_paginated(
+        timetables, 
+        courses,
+        page=page_num, 
+        per_page=10,
+        staff_preferences=staff_preferences,
+        staff_strictness=staff_strictness,
+        constraints_strictness=constraints_strictness,
+        stats=stats,
+        summary=summary,
+        render_cache=entry.render_cache
+    )
+    return stats_html + html_out
 
 @app.post("/generate")
 async def generate_timetable(
@@ -2069,9 +4718,44 @@ async def generate_timetable(
     preferred_staff: str = Form(""),
     priority_mode: str = Form("staff"),
     staff_strictness: str = Form("strict"),
-    constraints_strictness: str = Form("strict")
+    constraints_strictness: str = Form("strict"),
+    catalog_id: str = Form("", alias="catalog"),
+    output_format: str = Form("html", alias="format"),
+    early: str = Form("no"),
+    more: str = Form("no"),
+    order: str = Form("score"),
+    sample: str = Form("no"),
+    seed: str = Form(""),
+    diverse: str = Form(""),
+    per_page: str = Form("")
 ):
-    """Generate timetables based on constraints."""
+    """Generate timetables based on constraints.
+
+    Returns one rendered HTML page by default; `format=json` returns the
+    whole result set as section ids for client-side rendering, and
+    `format=stream` the same as NDJSON, sending timetables as they are found.
+    With `early=yes`, html and json respond once the search has found
+    enough timetables to rank a first page and the search finishes in the
+    background; responses until then are flagged `searching` in the stats.
+    This is for API clients: the page streams its preview instead.
+    With `more=yes`, a cached search that stopped early (`resumable` in the
+    stats) continues from where it stopped and adds what it finds.
+    With `order=index`, results are every valid timetable in search order
+    rather than ranked, with no results limit: any page is built directly
+    (see ResultSpace), and json and stream return just that page. Searches
+    that can't be counted that way are ranked as usual.
+    With `sample=yes`, results are up to `limit` valid timetables drawn
+    uniformly at random within SAMPLE_TIMEOUT seconds, then ranked; an
+    integer `seed` makes the sample reproducible (the seed used is in the
+    stats).
+    With `diverse=N`, results are the N (at most 100) most different of the
+    top DIVERSE_POOL ranked timetables; stream responds as json, and the
+    response waits for the whole search.
+    With `per_page` (at most 100), json and the stream's "done" message
+    carry only page `page` of the result set; later pages are read from
+    the result cache with json requests.
+    """
+    started = time.monotonic()
     # Check rate limit
     await check_rate_limit(request)
     
@@ -2082,37 +4766,45 @@ async def generate_timetable(
     if len(preferred_staff) > 50000:
         raise HTTPException(status_code=413, detail="Staff preferences input too large")
     
-    courses = load_courses()
+    output_format = output_format.strip().lower()
+    if output_format not in ("html", "json", "stream"):
+        output_format = "html"
+    as_json = output_format != "html"
+    if catalog_registry.resolve(catalog_id) is None:
+        if as_json:
+            return unknown_catalog_response(catalog_id)
+        return HTMLResponse(
+            '<div class="result-message"><h3>❌ Unknown Catalog</h3>'
+            f'<p>No catalog named "{html.escape(catalog_id)}" is available.</p></div>',
+            status_code=404
+        )
+    
+    # Pin one catalog version for the whole request
+    catalog = await get_catalog(catalog_id)
+    courses = catalog.courses if catalog else {}
     if not courses:
+        if as_json:
+            return JSONResponse({"error": "No courses loaded. Check output.txt file."}, status_code=400)
         return HTMLResponse(
-            '<div style="text-align:center;padding:40px;background:#0f172a;'
-            'border-radius:12px;border:1px solid #1f2937;">'
-            '<h3 style="color:#ef4444;">❌ No Course Data Found</h3>'
-            '<p style="color:#9ca3af;">Please check that output.txt exists and contains valid course data.</p>'
-            '</div>'
+            '<div class="result-message"><h3>❌ No Course Data Found</h3>'
+            '<p>Please check that output.txt exists and contains valid course data.</p></div>'
         )
 
     # Parse selected subjects
     selected_codes: List[str] = []
+    whole_catalog = False
     if not selected_subjects or selected_subjects.strip().upper() in ("", "ANYTHING"):
         selected_codes = list(courses.keys())
+        whole_catalog = True
     else:
-        normalized_inputs = [
-            normalize_course_code(s.strip())
-            for s in selected_subjects.split(",")
-            if s.strip()
-        ]
-        
-        for norm_input in normalized_inputs:
-            if norm_input in courses:
-                selected_codes.append(norm_input)
-            else:
-                found_course = get_course(courses, norm_input)
-                if found_course:
-                    selected_codes.append(found_course.code)
+        for raw_input in selected_subjects.split(","):
+            found_code = catalog.index.resolve(normalize_course_code(raw_input))
+            if found_code:
+                selected_codes.append(found_code)
         
         if not selected_codes:
             selected_codes = list(courses.keys())
+            whole_catalog = True
     
     # Parse modes
     def normalize_mode(val: str) -> str:
@@ -2173,7 +4865,7 @@ async def generate_timetable(
                 if not isinstance(item, dict) or "subject" not in item or "staff" not in item:
                     raise ValueError("Each preference must have 'subject' and 'staff' keys")
                 
-                course_code = normalize_course_code(item["subject"])
+                course_code = catalog.index.resolve(normalize_course_code(str(item["subject"])))
                 if course_code in selected_codes:
                     staff_list = []
                     for s in item["staff"]:
@@ -2191,188 +4883,319 @@ async def generate_timetable(
         except ValueError as e:
             logger.warning(f"Invalid staff preferences format: {e}")
     
-    # Convert courses to dict for process pool
-    courses_dict = {}
-    for code, course in courses.items():
-        if code in selected_codes:
-            courses_dict[code] = course.to_dict()
+    search_kwargs = dict(
+        allow_morning_mode=morning_mode,
+        allow_evening_mode=evening_mode,
+        allow_saturday=allow_saturday_flag,
+        max_per_day=max_per_day,
+        need_free_day=require_free,
+        free_day_pref=free_day_norm,
+        staff_preferences=staff_preferences,
+        priority_mode=priority_mode,
+        staff_strictness=staff_strictness,
+        constraints_strictness=constraints_strictness
+    )
+    sampling = sample.strip().lower() == "yes"
+    if sampling:
+        try:
+            sample_seed = int(seed)
+        except ValueError:
+            sample_seed = None
+        search_kwargs.update(sample=True, sample_seed=sample_seed)
+    cache_key = result_cache.make_key(catalog.catalog_id, selected_codes, dict(search_kwargs, max_results=max_results))
+    cached = result_cache.get(cache_key, catalog.version)
+    staff_ranks = compile_staff_preferences(staff_preferences)
+    scorer = TimetableScorer(
+        morning_weight=1.0 if morning_mode == 'less' else 0.0,
+        evening_weight=1.0 if evening_mode == 'less' else 0.0,
+        staff_ranks=staff_ranks,
+        staff_strictness=staff_strictness
+    )
+    search = partial(
+        search_and_cache, catalog, selected_codes, whole_catalog, max_results, search_kwargs, scorer, cache_key
+    )
+    
+    # 🔐 email extracted earlier by middleware
+    log_activity = partial(log_user_activity, request.state.email, selected_subjects, {
+        "morning": allow_morning,
+        "evening": allow_evening,
+        "saturday": allow_sat,
+        "max_classes": max_classes,
+        "free_day": free_day
+    }, staff_preferences)
+    
+    # Everything else in the JSON payloads is determined by the cache key
+    settings = {
+        "priority_mode": priority_mode,
+        "staff_strictness": staff_strictness,
+        "constraints_strictness": constraints_strictness,
+        "courses": len(selected_codes),
+        "staff_preferences": len(staff_preferences),
+    }
     
-    # Run search
     try:
-        timetables, staff_warnings, staff_deviations, stats = await run_god_search_async(
-            courses_dict,
-            selected_codes,
-            max_results=max_results,
-            timeout=TIMETABLE_TIMEOUT,
-            allow_morning_mode=morning_mode,
-            allow_evening_mode=evening_mode,
-            allow_saturday=allow_saturday_flag,
-            max_per_day=max_per_day,
-            need_free_day=require_free,
-            free_day_pref=free_day_norm,
-            staff_preferences=staff_preferences,
-            priority_mode=priority_mode,
-            staff_strictness=staff_strictness,
-            constraints_strictness=constraints_strictness
-        )
-        
-        # Sort timetables by score
-        timetables.sort(
-            key=lambda twv: score_timetable(
-                twv.sections,
-                morning_weight=1.0 if morning_mode == 'less' else 0.0,
-                evening_weight=1.0 if evening_mode == 'less' else 0.0,
-                staff_preferences=staff_preferences,
-                staff_strictness=staff_strictness,
-                constraint_violations=twv.violations
-            )
-        )
-        
-    except Exception as e:
-        # Log full error but show generic message to user
-        logger.error(f"Search failed: {e}", exc_info=True)
-        return HTMLResponse(
-            f'''
-            <div style="text-align:center;padding:40px;background:#0f172a;
-            border-radius:12px;border:1px solid #1f2937;">
-                <h3 style="color:#ef4444;">❌ Search Error</h3>
-                <p style="color:#9ca3af;">
-                    An error occurred while searching for timetables.<br>
-                    Please try again with different parameters.
-                </p>
-            </div>
-            '''
-        )
+        page_num = int(page)
+    except Exception:
+        page_num = 1
     
-    # Prepare statistics display
-    priority_stats = ""
-    if priority_mode == 'staff':
-        priority_stats = f'''
-        <div><strong>Priority Mode:</strong> Staff First</div>
-        '''
-    else:
-        priority_stats = f'''
-        <div><strong>Priority Mode:</strong> Constraints First</div>
-        '''
+    try:
+        diverse_count = max(0, min(int(diverse), 100))
+    except ValueError:
+        diverse_count = 0
     
-    strictness_stats = f'''
-    <div><strong>Staff Strictness:</strong> {staff_strictness.capitalize()} mode</div>
-    <div><strong>Constraints Strictness:</strong> {constraints_strictness.capitalize()} mode</div>
-    '''
+    try:
+        per_page_count = max(0, min(int(per_page), 100))
+    except ValueError:
+        per_page_count = 0
+    # (page, per_page) to respond with, or None for the whole result set
+    paging = (page_num, per_page_count) if per_page_count else None
     
-    staff_stats = ""
-    if staff_preferences:
-        staff_stats = f'''
-        <div><strong>Staff preferences:</strong> Applied to {len(staff_preferences)} courses</div>
-        <div><strong>Warnings:</strong> {len(staff_warnings)} courses had unavailable preferred staff</div>
-        '''
+    if order.strip().lower() == "index" and not sampling and not diverse_count:
+        index_key = result_cache.make_key(catalog.catalog_id, selected_codes, dict(search_kwargs, order="index"))
+        entry = result_cache.get(index_key, catalog.version)
+        if entry is None:
+            entry = await off_loop(build_result_space, catalog, selected_codes, whole_catalog, search_kwargs)
+            if entry is not None:
+                result_cache.put(index_key, entry)
+        if entry is not None:
+            asyncio.get_running_loop().run_in_executor(None, log_activity, entry)
+            if as_json:
+                payload = await off_loop(page_payload, entry, catalog, scorer, staff_ranks, settings,
+                                         page_num, per_page_count or 10)
+                return await cached_json_response(request, payload, headers={"X-Catalog-Version": str(catalog.version)})
+            html_out = await off_loop(
+                render_generate_page, entry, courses, catalog.version, page_num, len(selected_codes),
+                staff_preferences, priority_mode, staff_strictness, constraints_strictness
+            )
+            return HTMLResponse(html_out, headers={"X-Catalog-Version": str(catalog.version)})
     
-    constraint_stats = ""
-    if constraints_strictness == 'flexible':
-        violations_count = sum(len(twv.violations) for twv in timetables)
-        timetables_with_violations = sum(1 for twv in timetables if twv.has_violations())
-        constraint_stats = f'''
-        <div><strong>Constraint Violations:</strong> {violations_count} total</div>
-        <div><strong>Timetables with violations:</strong> {timetables_with_violations} of {len(timetables)}</div>
-        '''
+    early_response = early.strip().lower() == "yes" and not diverse_count
+    resume = None
+    if more.strip().lower() == "yes" and cached is not None and cached.checkpoint is not None:
+        resume, cached = cached, None
+    pending = None if cached is not None else pending_search(cache_key, catalog.version)
+    if resume is not None:
+        # Responses wait for the resumed search: its early results are only the new ones
+        early_response = False
+        if pending is None:
+            pending = start_background_search(catalog, cache_key, partial(search, resume=resume))
     
-    coverage = stats.get('coverage_percentage', 0.0)
-    search_complete = stats.get('search_complete', False)
+    if output_format == "stream" and not diverse_count:
+        if pending is not None:
+            search = partial(join_search, pending)
+        return StreamingResponse(
+            stream_results(started, catalog, cached, search, scorer, staff_ranks, settings, log_activity, paging),
+            media_type="application/x-ndjson",
+            headers={"X-Catalog-Version": str(catalog.version), "Cache-Control": "no-cache"}
+        )
     
-    if coverage >= 99.9 and search_complete:
-        coverage_text = "100% of search space explored"
-        guarantee_text = "All likely possibilities explored"
-    elif coverage > 0:
-        coverage_text = f"{coverage:.1f}% of search space explored"
-        guarantee_text = "Substantial search space explored"
+    if cached is not None:
+        entry = cached
     else:
-        coverage_text = "Search space explored with pruning"
-        guarantee_text = "Substantial search space explored"
+        try:
+            if early_response:
+                if pending is None:
+                    pending = start_background_search(catalog, cache_key, search)
+                entry = await wait_for_early_results(pending)
+                if entry is None:
+                    entry = await early_result(pending, catalog, scorer, staff_preferences)
+            elif pending is not None:
+                entry = await asyncio.shield(pending.task)
+            else:
+                entry = await search()
+        except Exception as e:
+            # Log full error but show generic message to user
+            logger.error(f"Search failed: {e}", exc_info=True)
+            if as_json:
+                return JSONResponse({"error": "Search failed"}, status_code=500)
+            return HTMLResponse(
+                '<div class="result-message"><h3>❌ Search Error</h3>'
+                '<p>An error occurred while searching for timetables.<br>'
+                'Please try again with different parameters.</p></div>'
+            )
     
-    stats_html = f'''
-    <div style="margin-bottom:20px;padding:20px;background:#0f172a;
-    border-radius:12px;border:1px solid #1f2937;">
-        <h3 style="color:#e5e7eb;margin-top:0;margin-bottom:10px;">
-            SEARCH STATISTICS
-        </h3>
-        <div style="color:#9ca3af;font-size:0.9rem;
-        display:grid;grid-template-columns:repeat(auto-fit, minmax(200px, 1fr));
-        gap:10px;">
-            {priority_stats}
-            {strictness_stats}
-            <div><strong>Search time:</strong> {stats.get('time_elapsed', 0):.2f} seconds</div>
-            <div><strong>Total courses:</strong> {len(selected_codes)}</div>
-            <div><strong>Valid timetables found:</strong> {len(timetables):,}</div>
-            <div><strong>Coverage:</strong> {coverage_text}</div>
-            <div><strong>Guarantee:</strong> {guarantee_text}</div>
-            {staff_stats}
-            {constraint_stats}
-        </div>
-    </div>
-    '''
-
-    try:
-        page_num = int(page)
-    except Exception:
-        page_num = 1
-
-    html_out = render_timetable_html_paginated(
-        timetables, 
-        courses,
-        page=page_num, 
-        per_page=10,
-        staff_preferences=staff_preferences,
-        staff_strictness=staff_strictness,
-        constraints_strictness=constraints_strictness,
-        stats=stats
+    # Recording activity is a network call: don't wait for it
+    asyncio.get_running_loop().run_in_executor(None, log_activity, entry)
+    if diverse_count:
+        entry = await off_loop(diverse_result, entry, diverse_count, staff_preferences)
+    timetables = entry.timetables
+    
+    if as_json and paging is not None:
+        payload = await off_loop(page_payload, entry, catalog, scorer, staff_ranks, settings, *paging)
+        response = await cached_json_response(request, payload, headers={"X-Catalog-Version": str(catalog.version)})
+        if timetables:
+            latency_metrics.record("time_to_first_timetable_json", time.monotonic() - started)
+        return response
+    if as_json:
+        body = await off_loop(json_results_body, entry, catalog, scorer, staff_ranks, settings)
+        response = precompressed_response(request, body, headers={"X-Catalog-Version": str(catalog.version)})
+        if timetables:
+            latency_metrics.record("time_to_first_timetable_json", time.monotonic() - started)
+        return response
+    
+    html_out = await off_loop(
+        render_generate_page, entry, courses, catalog.version, page_num, len(selected_codes),
+        staff_preferences, priority_mode, staff_strictness, constraints_strictness
     )
+    if timetables:
+        latency_metrics.record("time_to_first_timetable_html", time.monotonic() - started)
 
+    return HTMLResponse(html_out, headers={"X-Catalog-Version": str(catalog.version)})
 
-# 🔐 email extracted earlier by middleware
-    email = request.state.email
 
-    from supabase_client import supabase
-    try:
-        supabase.table("user_activity").insert({
-            "email": email,
-            "selected_subjects": selected_subjects,
-            "constraints": {
-                "morning": allow_morning,
-                "evening": allow_evening,
-                "saturday": allow_sat,
-                "max_classes": max_classes,
-                "free_day": free_day
-            },
-            "staff_preferences": staff_preferences,
-            "results_count": len(timetables),
-            "coverage": stats.get("coverage_percentage"),
-            "search_time": stats.get("time_elapsed")
-        }).execute()
-    except Exception as e:
-        print("SUPABASE INSERT ERROR:", e)
-
-    return HTMLResponse(stats_html + html_out)
+@app.get("/reload_courses")
+async def reload_courses_endpoint(catalog_id: str = Query("", alias="catalog")):
+    """Force reload courses from file.
 
+    The new catalog is parsed in a worker thread and swapped in only if it
+    validates; requests keep being served from the previous version meanwhile.
+    """
+    resolved = catalog_registry.resolve(catalog_id)
+    if resolved is None:
+        return unknown_catalog_response(catalog_id)
+    previous = catalog_registry.cache_for(resolved).get()
+    loop = asyncio.get_running_loop()
+    snapshot = await loop.run_in_executor(None, partial(load_catalog, True, resolved))
+    
+    if snapshot is None or snapshot is previous:
+        return JSONResponse({
+            "status": "Reload failed, previous catalog kept",
+            "catalog_version": previous.version if previous else None
+        }, status_code=500)
+    
+    return JSONResponse({
+        "status": "Courses reloaded",
+        "catalog": resolved,
+        "catalog_version": snapshot.version,
+        "previous_version": previous.version if previous else None,
+        "courses": len(snapshot.courses),
+        "diff": snapshot.diff.to_dict() if snapshot.diff else None
+    })
 
-@app.get("/reload_courses")
-async def reload_courses_endpoint():
-    """Force reload courses from file."""
-    course_cache.clear()
-    load_courses(force_reload=True)
-    return JSONResponse({"status": "Courses reloaded"})
+# ========== LIFECYCLE ==========
+@app.on_event("startup")
+async def startup_event():
+    """Warm the preloaded catalogs and static pages and start watching
+    catalog files for changes."""
+    loop = asyncio.get_running_loop()
+    for catalog_id in PRELOAD_CATALOGS:
+        await loop.run_in_executor(None, partial(load_catalog, False, catalog_id))
+    for page in (front_page, login_page_file):
+        await off_loop(page.body)
+    if CATALOG_WATCH:
+        catalog_registry.start_watching()
 
-# ========== CLEANUP ==========
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown."""
+    catalog_registry.stop_watching()
+    
     global _process_pool
     if _process_pool:
         _process_pool.shutdown(wait=True)
         _process_pool = None
         logger.info("Process pool shutdown")
+    
+    global _render_pool
+    if _render_pool:
+        _render_pool.shutdown(wait=True)
+        _render_pool = None
+    
+    global _progress_pool
+    if _progress_pool:
+        _progress_pool.shutdown(wait=True)
+        _progress_pool = None
+    
+    global _stream_manager
+    if _stream_manager:
+        _stream_manager.shutdown()
+        _stream_manager = None
+
+# ========== CLI ==========
+def run_cli(argv: List[str]) -> int:
+    """Maintenance commands: `python backend.py <command> ...`."""
+    parser = argparse.ArgumentParser(prog="backend.py", description="Timetable generator tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    compile_cmd = commands.add_parser("compile-catalog", help="Build the binary catalog snapshot")
+    compile_cmd.add_argument("--source", default=OUTPUT_FILE)
+    compile_cmd.add_argument("--output", default=None,
+                             help="Defaults to COMPILED_CATALOG, or <source>.catalog for a custom source")
+    compile_cmd.add_argument("--catalog", default=None, help="Compile a catalog from CATALOGS by id")
+    compile_cmd.add_argument("--all", action="store_true", help="Compile every catalog in CATALOGS")
+    
+    check_cmd = commands.add_parser("check-catalog", help="Exit non-zero if a compiled catalog is stale")
+    check_cmd.add_argument("--source", default=OUTPUT_FILE)
+    check_cmd.add_argument("--output", default=None,
+                           help="Defaults to COMPILED_CATALOG, or <source>.catalog for a custom source")
+    check_cmd.add_argument("--catalog", default=None, help="Check a catalog from CATALOGS by id")
+    check_cmd.add_argument("--all", action="store_true", help="Check every catalog in CATALOGS")
+    
+    ingest_cmd = commands.add_parser("ingest", help="Stream parsed courses as JSON lines")
+    ingest_cmd.add_argument("--source", default=OUTPUT_FILE)
+    ingest_cmd.add_argument("--summary", action="store_true", help="Only print totals")
+    
+    args = parser.parse_args(argv)
+    default_compiled = compiled_path_for(args.source)
+    
+    # (source, compiled path) pairs for compile-catalog and check-catalog
+    targets = []
+    if args.command in ("compile-catalog", "check-catalog"):
+        if args.all:
+            targets = [(path, compiled_path_for(path)) for path in CATALOG_SOURCES.values()]
+        elif args.catalog:
+            if args.catalog not in CATALOG_SOURCES:
+                print(f"Unknown catalog '{args.catalog}' (known: {', '.join(CATALOG_SOURCES)})", file=sys.stderr)
+                return 2
+            path = CATALOG_SOURCES[args.catalog]
+            targets = [(path, args.output or compiled_path_for(path))]
+        else:
+            targets = [(args.source, args.output or default_compiled)]
+    
+    if args.command == "compile-catalog":
+        for source, output in targets:
+            start = time.time()
+            n_courses, n_sections = compile_catalog(source, output)
+            print(f"Compiled {n_courses} courses / {n_sections} sections from {source} "
+                  f"into {output} in {time.time() - start:.2f}s")
+        return 0
+    
+    if args.command == "ingest":
+        n_courses = n_sections = 0
+        start = time.time()
+        for course in iter_catalog_file(args.source):
+            n_courses += 1
+            n_sections += len(course.sections)
+            if not args.summary:
+                print(json.dumps(course.to_dict(), ensure_ascii=False))
+        print(f"Ingested {n_courses} courses / {n_sections} sections from {args.source} "
+              f"in {time.time() - start:.2f}s", file=sys.stderr)
+        return 0
+    
+    if args.command == "check-catalog":
+        # 2 if any compiled catalog is unusable, else 1 if any is stale
+        status = 0
+        for source, path in targets:
+            try:
+                checksum = file_checksum(source)
+                with CompiledCatalog(path) as compiled:
+                    fresh = compiled.checksum == checksum
+            except (OSError, ValueError, struct.error) as e:
+                print(f"{path}: unusable ({e})")
+                status = 2
+                continue
+            print(f"{path}: {'up to date' if fresh else 'stale'} for {source}")
+            if not fresh:
+                status = max(status, 1)
+        return status
+    
+    return 2
 
 # ========== MAIN ==========
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(run_cli(sys.argv[1:]))
+    
     import uvicorn
     
     # Log startup information
@@ -0,0 +1,462 @@
+"""Parse benchmark for output.txt: single-pass tokenizer vs. the previous parser.
+
+Generates a synthetic catalog in the output.txt format and reports parse
+throughput and peak traced memory for `backend.parse_output_txt` and for a
+frozen copy of the parser it replaced.
+
+    python bench_parse.py                  # 100,000 sections
+    python bench_parse.py --sections 20000 --repeat 5
+"""
+import argparse, gc, logging, os, random, re, time, tracemalloc
+from typing import List, Dict, Tuple, Optional
+
+os.environ.setdefault("LOG_DIR", os.getenv("TMPDIR", "/tmp"))
+import backend
+from backend import Course, CourseSection, TimeSlot, DAYS_ORDER, normalize_course_code, logger
+
+# ========== FROZEN PRE-TOKENIZER PARSER (comparison baseline only) ==========
+def legacy_extract_hours_minutes(t: str) -> Tuple[int, int]:
+    """Extract hours and minutes from a time string with validation."""
+    t = str(t or "").strip()
+    if not t:
+        return 0, 0
+    
+    # Try to parse HH:MM or HH.MM format first
+    time_patterns = [
+        r'^(\d{1,2})[:\.](\d{2})$',
+        r'^(\d{3,4})$',
+    ]
+    
+    for pattern in time_patterns:
+        m = re.match(pattern, t)
+        if m:
+            if len(m.groups()) == 2:
+                hours = int(m.group(1))
+                minutes = int(m.group(2))
+            else:
+                digits = m.group(1)
+                if len(digits) == 3:
+                    hours = int(digits[0])
+                    minutes = int(digits[1:3])
+                elif len(digits) == 4:
+                    hours = int(digits[:2])
+                    minutes = int(digits[2:4])
+                else:
+                    continue
+            
+            # Validate ranges
+            if not (0 <= hours <= 23):
+                raise ValueError(f"Hour {hours} must be between 0 and 23")
+            if not (0 <= minutes <= 59):
+                raise ValueError(f"Minute {minutes} must be between 0 and 59")
+            
+            return hours, minutes
+    
+    # Fallback parsing
+    digits = re.sub(r'[^0-9]', '', t)
+    if not digits:
+        return 0, 0
+    
+    if len(digits) >= 4:
+        hours = int(digits[:2])
+        minutes = int(digits[2:4])
+    elif len(digits) == 3:
+        hours = int(digits[0])
+        minutes = int(digits[1:3])
+    elif len(digits) == 2:
+        hours = int(digits)
+        minutes = 0
+    else:
+        hours = int(digits)
+        minutes = 0
+    
+    # Handle minutes >= 60
+    if minutes >= 60:
+        hours += minutes // 60
+        minutes = minutes % 60
+    
+    # Validate final values
+    if not (0 <= hours <= 23):
+        hours = max(0, min(23, hours))
+    if not (0 <= minutes <= 59):
+        minutes = max(0, min(59, minutes))
+    
+    return hours, minutes
+
+def legacy_time_to_minutes(t: str) -> int:
+    """Convert time string to minutes since midnight."""
+    try:
+        h, m = legacy_extract_hours_minutes(t)
+        return h * 60 + m
+    except ValueError:
+        logger.warning(f"Invalid time format: {t}")
+        return 0
+
+def legacy_normalize_time_token(tok: str) -> str:
+    """Normalize a time token to HH:MM format."""
+    try:
+        h, m = legacy_extract_hours_minutes(tok)
+        return f"{h:02d}:{m:02d}"
+    except ValueError:
+        logger.warning(f"Invalid time token: {tok}")
+        return "00:00"
+
+def legacy_parse_single_time_range(part: str) -> Optional[Tuple[str, str]]:
+    """Parse a single time range string."""
+    part = part.strip()
+    if not part:
+        return None
+    
+    # Validate unambiguous ranges
+    if '-' in part and part.count('-') > 1:
+        logger.warning(f"Ambiguous time range with multiple hyphens: {part}")
+        return None
+    
+    patterns = [
+        r'(\d{1,2}(?:[:.]\d{1,2})?)\s*(?:[-–—~=@©]|to)\s*(\d{1,2}(?:[:.]\d{1,2})?)',
+        r'(\d{1,2}[:.]\d{2})\s+(\d{1,2}[:.]\d{2})',
+        r'(\d{1,2})\s*[-–—~=]\s*(\d{1,2})',
+    ]
+    
+    for p in patterns:
+        m = re.search(p, part, flags=re.IGNORECASE)
+        if m:
+            a, b = m.group(1), m.group(2)
+            try:
+                a_norm = legacy_normalize_time_token(a)
+                b_norm = legacy_normalize_time_token(b)
+                start_min = legacy_time_to_minutes(a_norm)
+                end_min = legacy_time_to_minutes(b_norm)
+                
+                # Validate logical order
+                if start_min >= end_min:
+                    logger.warning(f"Invalid time range (start >= end): {a_norm} >= {b_norm}")
+                    return None
+                
+                return a_norm, b_norm
+            except ValueError as e:
+                logger.warning(f"Invalid time in range: {e}")
+                return None
+    
+    return None
+
+def legacy_parse_time_range_string(time_str: str) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """Parse time range string and return ranges with warnings."""
+    if not time_str:
+        return [], []
+    
+    ranges: List[Tuple[str, str]] = []
+    warnings: List[str] = []
+    parts = re.split(r'[,，;、\n]', time_str)
+    
+    for i, part in enumerate(parts):
+        part = part.strip()
+        if not part:
+            continue
+        
+        r = legacy_parse_single_time_range(part)
+        if r:
+            ranges.append(r)
+        else:
+            tokens = re.findall(r'\d{1,2}(?:[:.]\d{1,2})?', part)
+            if len(tokens) % 2 == 1:
+                warnings.append(f"Odd number of time tokens in '{part}', ignoring last token")
+                tokens = tokens[:-1]
+            
+            for i in range(0, len(tokens), 2):
+                try:
+                    s = legacy_normalize_time_token(tokens[i])
+                    e = legacy_normalize_time_token(tokens[i + 1])
+                    start_min = legacy_time_to_minutes(s)
+                    end_min = legacy_time_to_minutes(e)
+                    
+                    if start_min < end_min:
+                        ranges.append((s, e))
+                    else:
+                        warnings.append(f"Invalid time range: {s} >= {e}")
+                except (ValueError, IndexError) as e:
+                    warnings.append(f"Error parsing time tokens: {e}")
+    
+    return ranges, warnings
+
+def legacy_normalize_faculty(name: str) -> str:
+    """Normalize faculty name."""
+    if not name:
+        return ""
+    s = str(name).strip()
+    s = re.sub(r'[.\s]+$', '', s)
+    s = re.sub(r'\s+', ' ', s)
+    return s
+
+def legacy_parse_section_line(line: str) -> Tuple[str, str, str]:
+    """Parse section line with case-insensitive handling."""
+    line = line.strip()
+    if line.lower().startswith("section:"):
+        colon_idx = line.lower().find(":")
+        line = line[colon_idx + 1:].strip()
+    
+    patterns = [
+        (r'^\s*([^,]+?)\s*,\s*(.+?)\s*-\s*(.+)$', 3),
+        (r'^\s*([^,]+?)\s*,\s*(.+)$', 2),
+        (r'^\s*(.+)$', 1),
+    ]
+    
+    section_code = ""
+    dept = ""
+    faculty = ""
+    
+    for pat, count in patterns:
+        m = re.match(pat, line)
+        if m:
+            section_code = m.group(1).strip()
+            if count >= 2:
+                dept = m.group(2).strip()
+            if count >= 3:
+                faculty = legacy_normalize_faculty(m.group(3))
+            break
+    
+    return section_code, dept, faculty
+
+def legacy_parse_output_txt(text: str) -> Dict[str, Course]:
+    """Parse output.txt content into Course objects."""
+    if not text:
+        return {}
+    
+    courses: Dict[str, Course] = {}
+    current_subject = None
+    current_name = ""
+    current_credits = ""
+    current_sections: List[CourseSection] = []
+    lines = text.splitlines()
+    i = 0
+    parse_warnings: List[str] = []
+    
+    while i < len(lines):
+        line = lines[i].strip()
+        
+        # Subject detection
+        if line.lower().startswith("subject:"):
+            if current_subject is not None and current_sections:
+                courses[current_subject] = Course(
+                    code=current_subject,
+                    name=current_name,
+                    credits=current_credits,
+                    sections=current_sections.copy()
+                )
+            
+            current_sections = []
+            
+            # Extract after "subject:"
+            colon_idx = line.lower().find("subject:")
+            after_subject = line[colon_idx + len("subject:"):].strip()
+            
+            # Try to match course code and credits
+            m = re.match(r'^\s*([^\s]+)(?:\s+\[(\d+)\s+Credits\])?', after_subject, re.IGNORECASE)
+            if m:
+                current_subject = normalize_course_code(m.group(1))
+                current_credits = m.group(2) or ""
+            else:
+                # Fallback
+                parts = after_subject.split()
+                current_subject = normalize_course_code(parts[0]) if parts else "UNKNOWN"
+                current_credits = ""
+                if not parts:
+                    parse_warnings.append(f"Empty subject at line {i+1}")
+            
+            current_name = ""
+            i += 1
+        
+        # Course name detection
+        elif line.lower().startswith("course name:"):
+            colon_idx = line.lower().find("course name:")
+            current_name = line[colon_idx + len("course name:"):].strip()
+            i += 1
+        
+        # Section detection
+        elif line.lower().startswith("section:"):
+            section_code, dept, faculty = legacy_parse_section_line(line)
+            if not section_code:
+                i += 1
+                continue
+            
+            i += 1
+            # Skip metadata lines
+            while i < len(lines) and any(k.lower() in lines[i].lower() 
+                                        for k in ("Date:", "Type:", "Status:")):
+                i += 1
+            
+            time_slots: List[TimeSlot] = []
+            while i < len(lines):
+                cur = lines[i].strip()
+                cur_lower = cur.lower()
+                
+                # Break if next section or subject
+                if not cur or cur_lower.startswith("section:") or cur_lower.startswith("subject:"):
+                    break
+                
+                # Day matching
+                day_found = None
+                for day in DAYS_ORDER:
+                    if cur_lower.startswith(day.lower() + ":"):
+                        day_found = day
+                        break
+                
+                if day_found:
+                    colon_idx = cur_lower.find(":")
+                    times_part = cur[colon_idx + 1:].strip()
+                    ranges, warnings = legacy_parse_time_range_string(times_part)
+                    parse_warnings.extend(warnings)
+                    
+                    for s, e in ranges:
+                        smin = legacy_time_to_minutes(s)
+                        emin = legacy_time_to_minutes(e)
+                        if smin < emin:
+                            time_slots.append(
+                                TimeSlot(
+                                    day=day_found,
+                                    start_min=smin,
+                                    end_min=emin,
+                                    subject_code=current_subject or "",
+                                    section_code=section_code,
+                                    faculty=faculty
+                                )
+                            )
+                        else:
+                            parse_warnings.append(f"Invalid time range {s}-{e} for {day_found}")
+                
+                i += 1
+            
+            if time_slots:
+                current_sections.append(
+                    CourseSection(
+                        subject_code=current_subject or "",
+                        section_code=section_code,
+                        faculty=faculty,
+                        dept=dept,
+                        time_slots=time_slots
+                    )
+                )
+            else:
+                parse_warnings.append(f"Section {section_code} has no valid time slots")
+        
+        else:
+            i += 1
+    
+    # Add the last course
+    if current_subject is not None and current_sections:
+        courses[current_subject] = Course(
+            code=current_subject,
+            name=current_name or current_subject,
+            credits=current_credits,
+            sections=current_sections.copy()
+        )
+    
+    # Log warnings
+    for warning in parse_warnings:
+        logger.warning(f"Parse warning: {warning}")
+    
+    # Filter out courses without sections
+    for code in list(courses.keys()):
+        if not courses[code].sections:
+            logger.warning(f"Course {code} has no sections, removing")
+            del courses[code]
+    
+    return courses
+
+# ========== SYNTHETIC CATALOG ==========
+DEPTS = ["AI", "CSE", "ECE", "EEE", "MECH", "CIVIL", "ENGLISH", "MATHS", "PHYSICS", "CHEMISTRY"]
+TYPES = ["PROFESSIONAL CORE", "PROFESSIONAL ELECTIVE", "OPEN ELECTIVE", "HUMANITIES"]
+NAMELESS_EVERY = 50
+HOURS = ["08:00", "09:00", "10:00", "11:00", "12:00", "13:00", "14:00", "15:00", "16:00", "17:00"]
+
+def synthetic_catalog(n_sections: int, seed: int = 0) -> str:
+    """Build an output.txt-style catalog with exactly `n_sections` sections."""
+    rng = random.Random(seed)
+    faculty = [f"{rng.choice(['Dr. ', 'Prof. ', ''])}Staff {i} {chr(65 + i % 26)}" for i in range(2000)]
+    lines: List[str] = []
+    made = 0
+    subject = 0
+    
+    while made < n_sections:
+        subject += 1
+        n = min(rng.randint(1, 8), n_sections - made)
+        lines += [
+            f"Subject: 19X{subject:05d} [{rng.choice([2, 3, 4])} Credits]",
+            f"Type: {rng.choice(TYPES)}",
+        ]
+        # Some blocks have no name line, to cover the name fallback
+        if subject % NAMELESS_EVERY:
+            lines.append(f"Course Name: Synthetic Course {subject}")
+        lines += [f"Status: {rng.choice(['Open', 'Full'])}", ""]
+        for k in range(n):
+            lines.append(f"  Section: 4K{k}-{subject}, {rng.choice(DEPTS)} - {rng.choice(faculty)}")
+            lines.append("    Date: 04-08-2025 to 29-11-2025")
+            for day in rng.sample(DAYS_ORDER, 2):
+                start = rng.randrange(len(HOURS) - 2)
+                lines.append(
+                    f"    {day}: {HOURS[start]} – {HOURS[start + 1]}, {HOURS[start + 1]} – {HOURS[start + 2]}"
+                )
+            lines.append("")
+        made += n
+    
+    return "\n".join(lines) + "\n"
+
+# ========== MEASUREMENT ==========
+def measure(parse, text: str, repeat: int) -> Tuple[float, int, Dict[str, Course]]:
+    """Best-of-`repeat` wall time and peak traced allocation of one parse."""
+    best = float("inf")
+    result = {}
+    for _ in range(repeat):
+        backend.parse_day_times.cache_clear()
+        gc.collect()
+        start = time.perf_counter()
+        result = parse(text)
+        best = min(best, time.perf_counter() - start)
+        del result
+    
+    backend.parse_day_times.cache_clear()
+    gc.collect()
+    tracemalloc.start()
+    result = parse(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sections", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    # Parse warnings are not what we're measuring
+    logging.disable(logging.WARNING)
+    
+    text = synthetic_catalog(args.sections, args.seed)
+    size_mb = len(text.encode("utf-8")) / 1e6
+    print(f"Synthetic catalog: {args.sections:,} sections, {text.count(chr(10)):,} lines, {size_mb:.1f} MB")
+    
+    results = {}
+    for label, parse in (("previous parser", legacy_parse_output_txt),
+                         ("single-pass tokenizer", backend.parse_output_txt)):
+        seconds, peak, courses = measure(parse, text, args.repeat)
+        n = sum(len(c.sections) for c in courses.values())
+        results[label] = (seconds, courses)
+        print(f"{label:>22}: {seconds:7.3f}s  {n / seconds:>10,.0f} sections/s  "
+              f"{size_mb / seconds:6.1f} MB/s  peak {peak / 1e6:7.1f} MB")
+    
+    (old_s, old_c), (new_s, new_c) = results.values()
+    # The previous parser named a course without a "Course Name:" line ""
+    # unless it was the last block, and its code then; the tokenizer always
+    # uses the code, as parse_blocks_incremental (one block at a time) did
+    renamed = sum(1 for k in old_c if k in new_c and old_c[k].name != new_c[k].name)
+    same = list(old_c) == list(new_c) and all(
+        (old_c[k].name or k, old_c[k].credits) == (new_c[k].name, new_c[k].credits)
+        and [s.to_dict() for s in old_c[k].sections] == [s.to_dict() for s in new_c[k].sections]
+        for k in old_c
+    )
+    print(f"Speedup: {old_s / new_s:.1f}x  (identical output: {same}, "
+          f"{renamed} nameless courses named by code instead of \"\")")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Render benchmark: cost of one results page for a large result set.
+
+Builds a synthetic result set from a synthetic catalog and times
+`backend.render_timetable_html_paginated` for single pages, with the
+result-set summary precomputed (as /generate does) and without it (the
+previous behaviour, which rescanned every result on each page), and
+repeat views of the same pages with the result set's render cache.
+Also reports the size of one page as sent (raw and gzipped).
+
+    python bench_render.py                 # 10,000 results
+    python bench_render.py --results 50000 --courses 8
+"""
+import argparse, gzip, logging, os, random, time
+from typing import List, Dict
+
+os.environ.setdefault("LOG_DIR", os.getenv("TMPDIR", "/tmp"))
+import backend
+from backend import ConstraintViolation, TimetableWithViolations
+from bench_parse import synthetic_catalog
+
+PER_PAGE = 10
+
+def synthetic_results(courses: Dict[str, backend.Course], n_courses: int, n_results: int,
+                      seed: int = 0) -> List[TimetableWithViolations]:
+    """`n_results` random section combinations over the largest courses."""
+    rng = random.Random(seed)
+    chosen = sorted(courses.values(), key=lambda c: -len(c.sections))[:n_courses]
+    return [
+        TimetableWithViolations(
+            sections=[rng.choice(course.sections) for course in chosen],
+            violations=[
+                ConstraintViolation("morning_classes", "Has morning classes", rng.randint(1, 5))
+                for _ in range(rng.choice([0, 0, 1, 2]))
+            ]
+        )
+        for _ in range(n_results)
+    ]
+
+def time_pages(render, pages: List[int], repeat: int) -> float:
+    """Mean seconds per page, best of `repeat` passes over `pages`."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for page in pages:
+            render(page)
+        best = min(best, (time.perf_counter() - start) / len(pages))
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--results", type=int, default=10_000)
+    parser.add_argument("--courses", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+
+    courses = backend.parse_output_txt(synthetic_catalog(2_000, args.seed))
+    timetables = synthetic_results(courses, args.courses, args.results, args.seed)
+    # Prefer one staff member per course so the warning aggregate has work to do
+    staff_preferences = {
+        section.subject_code: [section.get_normalized_staff_name()]
+        for section in timetables[0].sections
+    }
+    last_page = (len(timetables) + PER_PAGE - 1) // PER_PAGE
+    pages = [1, 2, last_page // 2, last_page]
+    print(f"{len(timetables):,} results over {args.courses} courses, {PER_PAGE} per page")
+
+    start = time.perf_counter()
+    summary = backend.summarize_results(timetables, staff_preferences)
+    summarize_s = time.perf_counter() - start
+
+    def render(page, summary=None, render_cache=None):
+        return backend.render_timetable_html_paginated(
+            timetables, courses, page=page, per_page=PER_PAGE,
+            staff_preferences=staff_preferences, staff_strictness="flexible",
+            constraints_strictness="flexible", summary=summary,
+            render_cache=render_cache
+        )
+
+    render_cache = backend.RenderCache()
+    assert render(1) == render(1, summary) == render(1, summary, render_cache)
+    with_summary = time_pages(lambda page: render(page, summary), pages, args.repeat)
+    without_summary = time_pages(render, pages, args.repeat)
+    for page in pages:
+        render(page, summary, render_cache)
+    cached = time_pages(lambda page: render(page, summary, render_cache), pages, args.repeat)
+
+    print(f"{'summarize once':>22}: {summarize_s * 1000:8.2f} ms")
+    print(f"{'page, with summary':>22}: {with_summary * 1000:8.2f} ms")
+    print(f"{'page, rescanning all':>22}: {without_summary * 1000:8.2f} ms")
+    print(f"{'page, render cache':>22}: {cached * 1000:8.2f} ms")
+    print(f"Per-page speedup: {without_summary / with_summary:.1f}x")
+    body = render(2, summary).encode()
+    print(f"Page payload: {len(body):,} bytes, {len(gzip.compress(body)):,} gzipped")
+
+if __name__ == "__main__":
+    main()